@@ -0,0 +1,169 @@
+"""
+Answers many degrees-of-separation queries against one loaded graph.
+
+Usage: python batch.py [--compact] [--bidirectional] [--fuzzy] [--policy POLICY]
+                       [--serve PORT] directory [pairs]
+
+In batch mode, reads tab-separated "source<TAB>target" name pairs from the
+pairs file (or stdin) and writes one JSON result line per pair to stdout.
+With --serve, answers GET /?source=NAME&target=NAME over local HTTP instead.
+Names shared by several people are resolved by --policy; with --fuzzy,
+unknown names fall back to prefix and typo-tolerant matches.
+Throughput is reported on stderr when the run ends.
+"""
+
+import argparse
+import json
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import degrees
+
+
+def answer(source_name, target_name, bidirectional=False, policy="most-credited"):
+    """
+    Returns a JSON-serializable result for one (source, target) name pair.
+    Never prompts: names are resolved by policy, and names that cannot be
+    resolved are reported as errors.
+    """
+    result = {"source": source_name, "target": target_name}
+    ids = []
+    for name in (source_name, target_name):
+        person_id = degrees.person_id_for_name(name, policy)
+        if person_id is None:
+            person_ids = degrees.person_ids_for_name(name)
+            if len(person_ids) > 1:
+                result["error"] = f"ambiguous name: {name}"
+                result["candidates"] = sorted(person_ids)
+            else:
+                result["error"] = f"person not found: {name}"
+            return result
+        ids.append(person_id)
+    result["source_id"], result["target_id"] = ids
+
+    path = degrees.shortest_path(ids[0], ids[1], bidirectional=bidirectional)
+    if path is None:
+        result["degrees"] = None
+        return result
+
+    result["degrees"] = len(path)
+    result["path"] = [
+        {"movie": degrees.movie_info(movie_id)["title"],
+         "person": degrees.person_info(person_id)["name"]}
+        for movie_id, person_id in path
+    ]
+    return result
+
+
+def read_pairs(lines):
+    """
+    Yields (source, target, error) for tab-separated lines, skipping
+    blank lines and lines starting with '#'. error is None for a valid
+    pair; for a malformed line, source is the whole line and target None.
+    """
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if not line.strip() or line.startswith("#"):
+            continue
+        fields = line.split("\t")
+        if len(fields) != 2:
+            yield line, None, "expected 'source<TAB>target'"
+            continue
+        yield fields[0].strip(), fields[1].strip(), None
+
+
+def run_batch(lines, output, bidirectional=False, policy="most-credited"):
+    """
+    Streams one JSON result line to output per pair in lines; malformed
+    lines get an error line and do not stop the stream.
+    Returns the number of queries answered.
+    """
+    count = 0
+    for source, target, error in read_pairs(lines):
+        if error is not None:
+            output.write(json.dumps({"line": source, "error": error}) + "\n")
+            output.flush()
+            continue
+        output.write(json.dumps(answer(source, target, bidirectional, policy)) + "\n")
+        output.flush()
+        count += 1
+    return count
+
+
+def serve(port, bidirectional=False, policy="most-credited"):
+    """
+    Serves queries over HTTP on localhost until interrupted.
+    Returns the number of queries answered and the seconds spent
+    answering them, which excludes time spent waiting for requests.
+    """
+    served = [0, 0.0]
+    lock = threading.Lock()
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            query = parse_qs(urlparse(self.path).query)
+            if "source" not in query or "target" not in query:
+                self.send_error(400, "expected ?source=NAME&target=NAME")
+                return
+            start = time.perf_counter()
+            result = answer(query["source"][0], query["target"][0], bidirectional, policy)
+            elapsed = time.perf_counter() - start
+            with lock:
+                served[0] += 1
+                served[1] += elapsed
+            body = json.dumps(result).encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    print(f"Serving on http://127.0.0.1:{server.server_address[1]}/", file=sys.stderr)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return served[0], served[1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("directory")
+    parser.add_argument("pairs", nargs="?", help="file of tab-separated name pairs (default: stdin)")
+    parser.add_argument("--compact", action="store_true")
+    parser.add_argument("--bidirectional", action="store_true")
+    parser.add_argument("--fuzzy", action="store_true")
+    parser.add_argument("--policy", choices=degrees.POLICIES, default="most-credited")
+    parser.add_argument("--serve", type=int, metavar="PORT")
+    args = parser.parse_args()
+
+    print("Loading data...", file=sys.stderr)
+    degrees.load_data(args.directory, args.compact, name_index=args.fuzzy)
+    print("Data loaded.", file=sys.stderr)
+
+    start = time.perf_counter()
+    if args.serve is not None:
+        count, elapsed = serve(args.serve, args.bidirectional, args.policy)
+    else:
+        if args.pairs is None:
+            count = run_batch(sys.stdin, sys.stdout, args.bidirectional, args.policy)
+        else:
+            with open(args.pairs, encoding="utf-8") as f:
+                count = run_batch(f, sys.stdout, args.bidirectional, args.policy)
+        elapsed = time.perf_counter() - start
+
+    rate = count / elapsed if elapsed > 0 else 0.0
+    print(f"{count} queries in {elapsed:.3f}s ({rate:.1f} queries/sec)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+"""
+Benchmarks for the degrees search engine.
+
+Usage:
+    python benchmark.py generate [--edges N] [--seed S] directory
+    python benchmark.py run [--queries Q] [--memory] [--json FILE]
+                            [--baseline FILE] [--tolerance T] directory ...
+    python benchmark.py search [--people N] [--movies M] [--cast K]
+                               [--queries Q] [directory ...]
+
+generate writes synthetic people/movies/stars CSV files with power-law
+cast sizes and actor popularity. run times load_data, neighbors_for_person
+and shortest_path on each dataset and backend, and with --baseline exits
+non-zero if any throughput regressed. search compares nodes expanded by
+breadth-first and bidirectional search, and neighbor generation time with
+and without the co-star adjacency.
+"""
+
+import argparse
+import csv
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from array import array
+from itertools import accumulate
+
+import degrees
+from graph import StarGraph
+
+# Syllables used to make pronounceable synthetic names and titles
+SYLLABLES = ["an", "ber", "ca", "den", "el", "fa", "gor", "ha", "is", "jo",
+             "ka", "lin", "mar", "ne", "ol", "per", "qui", "ro", "sa", "ton",
+             "ur", "ve", "wil", "xi", "ya", "zo"]
+
+
+def random_graph(people, movies, cast, seed=0):
+    """
+    Returns a synthetic StarGraph where each movie stars between
+    1 and `cast` people chosen uniformly at random.
+    """
+    rng = random.Random(seed)
+    graph = StarGraph()
+    graph.person_ids = [str(i) for i in range(people)]
+    graph.person_names = [f"Person {i}" for i in range(people)]
+    graph.person_births = [""] * people
+    graph.movie_ids = [str(i) for i in range(movies)]
+    graph.movie_titles = [f"Movie {i}" for i in range(movies)]
+    graph.movie_years = [""] * movies
+
+    edge_people = array("i")
+    edge_movies = array("i")
+    for movie in range(movies):
+        for person in rng.sample(range(people), rng.randint(1, cast)):
+            edge_people.append(person)
+            edge_movies.append(movie)
+    graph.set_edges(edge_people, edge_movies)
+    graph._build_index()
+    return graph
+
+
+def generate_dataset(directory, edges, seed=0, alpha=1.6, max_cast=200, skew=0.8):
+    """
+    Writes people.csv, movies.csv and stars.csv with about `edges` star rows
+    to directory. Cast sizes follow a Pareto distribution with exponent
+    alpha (capped at max_cast), and each cast member is drawn from a Zipf
+    distribution with exponent skew over people, so a few actors appear in
+    very many movies and most in one or two.
+    """
+    rng = random.Random(seed)
+    people = max(10, edges // 3)
+    os.makedirs(directory, exist_ok=True)
+
+    def words(count):
+        return " ".join(
+            "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(1, 3))).capitalize()
+            for _ in range(count))
+
+    with open(os.path.join(directory, "people.csv"), "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "name", "birth"])
+        for person in range(people):
+            writer.writerow([person + 1, words(2), rng.randint(1920, 2010)])
+
+    # Popularity rank is shuffled so it does not follow person ids
+    ranks = list(range(1, people + 1))
+    rng.shuffle(ranks)
+    cumulative = list(accumulate(1 / rank ** skew for rank in ranks))
+
+    movies = 0
+    written = 0
+    with open(os.path.join(directory, "stars.csv"), "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["person_id", "movie_id"])
+        while written < edges:
+            movies += 1
+            cast = min(max_cast, int(rng.paretovariate(alpha)), edges - written)
+            stars = set(rng.choices(range(people), cum_weights=cumulative, k=cast))
+            for person in stars:
+                writer.writerow([person + 1, movies])
+            written += len(stars)
+
+    with open(os.path.join(directory, "movies.csv"), "w", encoding="utf-8", newline="") as f:
+        writer = csv.writer(f)
+        writer.writerow(["id", "title", "year"])
+        for movie in range(1, movies + 1):
+            writer.writerow([movie, words(rng.randint(1, 3)), rng.randint(1920, 2024)])
+
+    return people, movies, written
+
+
+def measure(function, memory=False):
+    """
+    Calls function and returns (result, seconds, peak bytes allocated or None).
+    """
+    if memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        result = function()
+    finally:
+        elapsed = time.perf_counter() - start
+        peak = None
+        if memory:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def run_dataset(directory, queries, memory=False, seed=0):
+    """
+    Benchmarks one dataset on every backend. Returns {metric: value}.
+    """
+    results = {}
+    backends = [
+        ("dict", dict(compact=False)),
+        ("compact", dict(compact=True, cache=False)),
+        ("snapshot", dict(compact=True, cache=True)),
+    ]
+    for backend, options in backends:
+        degrees.names.clear()
+        degrees.people.clear()
+        degrees.movies.clear()
+        if backend == "snapshot":
+            # Make sure the snapshot exists so only the mapped load is timed
+            degrees.load_data(directory, **options)
+        _, elapsed, peak = measure(lambda: degrees.load_data(directory, **options), memory)
+        results[f"{backend}.load_seconds"] = elapsed
+        if peak is not None:
+            results[f"{backend}.load_peak_bytes"] = peak
+
+        person_ids = (list(degrees.people) if degrees.graph is None
+                      else list(degrees.graph.person_ids))
+        rng = random.Random(seed)
+        sample = [rng.choice(person_ids) for _ in range(queries)]
+        pairs = [(rng.choice(person_ids), rng.choice(person_ids)) for _ in range(queries)]
+
+        _, elapsed, _ = measure(lambda: [degrees.neighbors_for_person(p) for p in sample])
+        results[f"{backend}.neighbors_per_sec"] = len(sample) / elapsed if elapsed else 0.0
+
+        for mode, bidirectional in (("bfs", False), ("bidirectional", True)):
+            degrees.stats["expanded"] = 0
+            _, elapsed, _ = measure(lambda: [
+                degrees.shortest_path(source, target, bidirectional=bidirectional)
+                for source, target in pairs])
+            results[f"{backend}.{mode}_queries_per_sec"] = len(pairs) / elapsed if elapsed else 0.0
+            results[f"{backend}.{mode}_expanded_per_query"] = degrees.stats["expanded"] / len(pairs)
+    return results
+
+
+def regressions(results, baseline, tolerance):
+    """
+    Returns descriptions of metrics more than tolerance (a fraction) worse
+    than in baseline: lower throughput, or higher load time or memory.
+    """
+    found = []
+    for metric, old in baseline.items():
+        new = results.get(metric)
+        if new is None or not old:
+            continue
+        if metric.endswith("_per_sec"):
+            worse = new < old * (1 - tolerance)
+        elif metric.endswith("_seconds") or metric.endswith("_bytes"):
+            worse = new > old * (1 + tolerance)
+        else:
+            continue
+        if worse:
+            found.append(f"{metric}: {old:.4g} -> {new:.4g}")
+    return found
+
+
+def compare(pairs):
+    """
+    Runs both searches over (source, target) person id pairs and prints
+    nodes expanded and time taken. Raises if path lengths ever differ.
+    """
+    totals = {}
+    for bidirectional in (False, True):
+        degrees.stats["expanded"] = 0
+        lengths = []
+        start = time.perf_counter()
+        for source, target in pairs:
+            path = degrees.shortest_path(source, target, bidirectional=bidirectional)
+            lengths.append(None if path is None else len(path))
+        elapsed = time.perf_counter() - start
+        totals[bidirectional] = (degrees.stats["expanded"], elapsed, lengths)
+
+    if totals[False][2] != totals[True][2]:
+        raise RuntimeError("bidirectional path lengths differ from BFS")
+
+    bfs, bidi = totals[False][0], totals[True][0]
+    print(f"    queries:       {len(pairs)}")
+    print(f"    bfs:           {bfs} expanded, {totals[False][1]:.3f}s")
+    print(f"    bidirectional: {bidi} expanded, {totals[True][1]:.3f}s")
+    if bidi:
+        print(f"    reduction:     {bfs / bidi:.1f}x fewer nodes expanded")
+
+
+def compare_costars(pairs):
+    """
+    Runs breadth-first search over pairs on the current compact graph with
+    and without its precomputed co-star adjacency, printing the time spent
+    generating neighbors in each case.
+    """
+    graph = degrees.graph
+    totals = {}
+    degrees.profile_neighbors = True
+    try:
+        for precomputed in (False, True):
+            if precomputed:
+                start = time.perf_counter()
+                graph.build_costars()
+                build = time.perf_counter() - start
+            else:
+                graph.costar_offsets = graph.costar_people = graph.costar_movies = None
+            degrees.stats["neighbor_calls"] = 0
+            degrees.stats["neighbor_time"] = 0.0
+            lengths = []
+            for source, target in pairs:
+                path = degrees.shortest_path(source, target)
+                lengths.append(None if path is None else len(path))
+            totals[precomputed] = (degrees.stats["neighbor_time"], degrees.stats["neighbor_calls"], lengths)
+    finally:
+        degrees.profile_neighbors = False
+
+    if totals[False][2] != totals[True][2]:
+        raise RuntimeError("co-star adjacency path lengths differ from BFS")
+
+    before, after = totals[False][0], totals[True][0]
+    print(f"    neighbor calls:  {totals[True][1]}")
+    print(f"    star expansion:  {before:.3f}s generating neighbors")
+    print(f"    co-star lookup:  {after:.3f}s generating neighbors ({build:.3f}s to build)")
+    print(f"    saved:           {before - after:.3f}s")
+
+
+def random_pairs(person_ids, count, seed=0):
+    rng = random.Random(seed)
+    return [(rng.choice(person_ids), rng.choice(person_ids)) for _ in range(count)]
+
+
+def main_generate(args):
+    people, movies, edges = generate_dataset(args.directory, args.edges, args.seed)
+    print(f"Wrote {people} people, {movies} movies, {edges} stars to {args.directory}")
+
+
+def main_run(args):
+    results = {}
+    for directory in args.directories:
+        print(f"Dataset {directory}")
+        for metric, value in run_dataset(directory, args.queries, args.memory).items():
+            results[f"{directory}.{metric}"] = value
+            print(f"    {metric:<40} {value:.4g}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        found = regressions(results, baseline, args.tolerance)
+        if found:
+            print("Regressions:")
+            for line in found:
+                print(f"    {line}")
+            sys.exit(1)
+        print("No regressions.")
+
+
+def main_search(args):
+    for directory in args.directories:
+        print(f"Dataset {directory}")
+        degrees.load_data(directory, compact=True)
+        person_ids = degrees.graph.person_ids
+        pairs = [(source, target) for source in person_ids for target in person_ids]
+        compare(pairs)
+        compare_costars(pairs)
+
+    print(f"Synthetic {args.people} people, {args.movies} movies, cast <= {args.cast}")
+    degrees.graph = random_graph(args.people, args.movies, args.cast)
+    pairs = random_pairs(degrees.graph.person_ids, args.queries)
+    compare(pairs)
+    compare_costars(pairs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    generate = commands.add_parser("generate", help="write a synthetic dataset")
+    generate.add_argument("directory")
+    generate.add_argument("--edges", type=int, default=10000)
+    generate.add_argument("--seed", type=int, default=0)
+    generate.set_defaults(handler=main_generate)
+
+    run = commands.add_parser("run", help="time load_data, neighbors_for_person and shortest_path")
+    run.add_argument("directories", nargs="+", metavar="directory")
+    run.add_argument("--queries", type=int, default=100)
+    run.add_argument("--memory", action="store_true", help="trace peak memory of each load")
+    run.add_argument("--json", metavar="FILE", help="write results as JSON")
+    run.add_argument("--baseline", metavar="FILE", help="fail on regressions against JSON results")
+    run.add_argument("--tolerance", type=float, default=0.2)
+    run.set_defaults(handler=main_run)
+
+    search = commands.add_parser("search", help="compare search strategies")
+    search.add_argument("directories", nargs="*", default=["small"], metavar="directory")
+    search.add_argument("--people", type=int, default=20000)
+    search.add_argument("--movies", type=int, default=5000)
+    search.add_argument("--cast", type=int, default=8)
+    search.add_argument("--queries", type=int, default=50)
+    search.set_defaults(handler=main_search)
+
+    args = parser.parse_args()
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,6 +1,10 @@
 import csv
 import sys
+import time
+from array import array
 
+from graph import StarGraph
+from nameindex import NameIndex
 from util import Node, StackFrontier, QueueFrontier
 
 # Maps names to a set of corresponding person_ids
@@ -12,11 +16,54 @@ people = {}
 # Maps movie_ids to a dictionary of: title, year, stars (a set of person_ids)
 movies = {}
 
+# Compact integer-indexed StarGraph, used instead of the dicts above when loaded
+graph = None
 
-def load_data(directory):
+# Maps person_ids to a tuple of (movie_id, person_id) pairs, one per co-star,
+# when precomputed by load_data(costars=True)
+adjacency = None
+
+# NameIndex over person names, and the person_id and number of movies at
+# each of its positions, when built by load_data(name_index=True)
+name_index = None
+name_ids = None
+name_credits = None
+
+# Non-interactive ways to pick one person among several with the same name
+POLICIES = ("most-credited", "first", "skip")
+
+# Search counters, reset by callers that want to measure a search
+stats = {"expanded": 0, "neighbor_calls": 0, "neighbor_time": 0.0}
+
+# Whether searches time every neighbor generation into stats
+profile_neighbors = False
+
+
+def load_data(directory, compact=False, cache=True, costars=False, name_index=False):
     """
     Load data from CSV files into memory.
+
+    If compact is True, load into a CSR-backed StarGraph instead of
+    the names/people/movies dicts. With cache, the StarGraph is
+    memory-mapped from a binary snapshot next to the CSV files, which
+    is rebuilt whenever a CSV file changes.
+
+    If costars is True, also precompute each person's deduplicated
+    co-stars so neighbor generation does no work during search.
+
+    If name_index is True, also build a NameIndex for prefix and
+    typo-tolerant name lookup.
     """
+    global graph, adjacency
+    adjacency = None
+    if compact:
+        graph = StarGraph.load(directory, cache)
+        if costars:
+            graph.build_costars()
+        index_names(name_index)
+        return
+    graph = None
+
     # Load people
     with open(f"{directory}/people.csv", encoding="utf-8") as f:
         reader = csv.DictReader(f)
@@ -51,15 +98,60 @@ def load_data(directory):
             except KeyError:
                 pass
 
+    if costars:
+        adjacency = precompute_costars()
+    index_names(name_index)
+
+
+def index_names(enabled=True):
+    """
+    Builds (or, if not enabled, drops) the NameIndex over all loaded people.
+    """
+    global name_index, name_ids, name_credits
+    if not enabled:
+        name_index = name_ids = name_credits = None
+    elif graph is not None:
+        # Positions are person indices, so credits come from the CSR offsets
+        name_index = NameIndex(graph.person_names)
+        name_ids = graph.person_ids
+        offsets = graph.person_offsets
+        name_credits = array("i", (offsets[i + 1] - offsets[i] for i in range(len(name_ids))))
+    else:
+        name_ids = list(people)
+        name_index = NameIndex([people[person_id]["name"] for person_id in name_ids])
+        name_credits = array("i", (len(people[person_id]["movies"]) for person_id in name_ids))
+
+
+def precompute_costars():
+    """
+    Returns the co-star adjacency built from people and movies, keeping
+    the smallest movie_id linking each pair of people and leaving out
+    the person themselves.
+    """
+    result = {}
+    for person_id, person in people.items():
+        linked = {}
+        for movie_id in sorted(person["movies"]):
+            for star_id in movies[movie_id]["stars"]:
+                if star_id != person_id and star_id not in linked:
+                    linked[star_id] = movie_id
+        result[person_id] = tuple(
+            (movie_id, star_id) for star_id, movie_id in linked.items())
+    return result
+
 
 def main():
-    if len(sys.argv) > 2:
-        sys.exit("Usage: python degrees.py [directory]")
-    directory = sys.argv[1] if len(sys.argv) == 2 else "large"
+    args = sys.argv[1:]
+    compact = "--compact" in args
+    if compact:
+        args.remove("--compact")
+    if len(args) > 1:
+        sys.exit("Usage: python degrees.py [--compact] [directory]")
+    directory = args[0] if len(args) == 1 else "large"
 
     # Load data from files into memory
     print("Loading data...")
-    load_data(directory)
+    load_data(directory, compact)
     print("Data loaded.")
 
     source = person_id_for_name(input("Name: "))
@@ -78,19 +170,59 @@ def main():
         print(f"{degrees} degrees of separation.")
         path = [(None, source)] + path
         for i in range(degrees):
-            person1 = people[path[i][1]]["name"]
-            person2 = people[path[i + 1][1]]["name"]
-            movie = movies[path[i + 1][0]]["title"]
+            person1 = person_info(path[i][1])["name"]
+            person2 = person_info(path[i + 1][1])["name"]
+            movie = movie_info(path[i + 1][0])["title"]
             print(f"{i + 1}: {person1} and {person2} starred in {movie}")
 
 
-def shortest_path(source, target):
+def shortest_path(source, target, bidirectional=False):
     """
     Returns the shortest list of (movie_id, person_id) pairs
     that connect the source to the target.
 
+    If bidirectional is True, search from both ends at once.
     If no possible path, returns None.
     """
+    search = bidirectional_search if bidirectional else breadth_first_search
+    if graph is not None:
+        neighbors = graph.neighbors
+        if profile_neighbors:
+            neighbors = timed(neighbors)
+        source_index = graph.person_index(source)
+        target_index = graph.person_index(target)
+        if source_index is None or target_index is None:
+            return None
+        path = search(source_index, target_index, neighbors)
+        if path is None:
+            return None
+        return [(graph.movie_ids[movie], graph.person_ids[person])
+                for movie, person in path]
+    if profile_neighbors:
+        return search(source, target, timed(neighbors_for_person))
+    return search(source, target, neighbors_for_person)
+
+
+def timed(neighbors):
+    """
+    Wraps a neighbors function to count calls and accumulate the time
+    spent generating neighbors into stats.
+    """
+    def wrapper(state):
+        start = time.perf_counter()
+        result = list(neighbors(state))
+        stats["neighbor_calls"] += 1
+        stats["neighbor_time"] += time.perf_counter() - start
+        return result
+    return wrapper
+
+
+def breadth_first_search(source, target, neighbors):
+    """
+    Breadth-first search from source to target, where neighbors(state)
+    yields (action, state) pairs. Returns the list of (action, state)
+    pairs on the shortest path, or None.
+    """
     frontier = QueueFrontier()
     experienced = set()
 
@@ -101,7 +233,8 @@ def shortest_path(source, target):
 
     while not frontier.empty():
         current_node = frontier.remove()
-        for neighbor in neighbors_for_person(current_node.state):
+        stats["expanded"] += 1
+        for neighbor in neighbors(current_node.state):
             if neighbor[1] in experienced:
                 continue
             add_node = Node(neighbor[1], current_node, neighbor)
@@ -120,18 +253,96 @@ def shortest_path(source, target):
         return None
 
 
-def person_id_for_name(name):
+def bidirectional_search(source, target, neighbors):
+    """
+    Bidirectional breadth-first search from source and target, where
+    neighbors(state) yields (action, state) pairs of a symmetric relation.
+    Expands a whole level of the smaller frontier at each step and returns
+    the same path format and length as breadth_first_search, or None.
+    """
+    if source == target:
+        return list()
+
+    # Maps state -> (action, previous state, depth) for each side
+    forward = {source: (None, None, 0)}
+    backward = {target: (None, None, 0)}
+    forward_frontier = [source]
+    backward_frontier = [target]
+
+    while forward_frontier and backward_frontier:
+        if len(forward_frontier) <= len(backward_frontier):
+            forward_frontier, meeting = expand_level(
+                forward_frontier, forward, backward, neighbors)
+        else:
+            backward_frontier, meeting = expand_level(
+                backward_frontier, backward, forward, neighbors)
+
+        if meeting is not None:
+            # Walk back to source, then forward to target
+            result = list()
+            state = meeting
+            while forward[state][1] is not None:
+                action, previous, _ = forward[state]
+                result.insert(0, (action, state))
+                state = previous
+            state = meeting
+            while backward[state][1] is not None:
+                action, following, _ = backward[state]
+                result.append((action, following))
+                state = following
+            return result
+    return None
+
+
+def expand_level(frontier, parents, other, neighbors):
+    """
+    Expands every state in frontier, recording newly reached states in
+    parents. Returns the next frontier and the state joining the two
+    searches with the shortest total depth (or None).
+    """
+    next_frontier = []
+    meeting = None
+    best = None
+    for state in frontier:
+        stats["expanded"] += 1
+        depth = parents[state][2] + 1
+        for action, neighbor in neighbors(state):
+            if neighbor in parents:
+                continue
+            parents[neighbor] = (action, state, depth)
+            next_frontier.append(neighbor)
+            if neighbor in other:
+                total = depth + other[neighbor][2]
+                if best is None or total < best:
+                    best = total
+                    meeting = neighbor
+    return next_frontier, meeting
+
+
+def person_id_for_name(name, policy=None):
     """
     Returns the IMDB id for a person's name,
     resolving ambiguities as needed.
+
+    If policy is one of POLICIES, never prompts: ambiguities are resolved
+    by the policy, and with a name index an unknown name falls back to
+    prefix and then typo-tolerant matches.
     """
-    person_ids = list(names.get(name.lower(), set()))
+    person_ids = person_ids_for_name(name)
+    if policy is not None:
+        # A blank name is a prefix of every name, so it matches nobody
+        if len(person_ids) == 0 and name_index is not None and name.strip():
+            # The policy chooses among all names starting with name
+            positions = (name_index.prefix(name, limit=None)
+                         or name_index.fuzzy(name, limit=1))
+            return disambiguate_positions(positions, policy)
+        return disambiguate(person_ids, policy)
     if len(person_ids) == 0:
         return None
     elif len(person_ids) > 1:
         print(f"Which '{name}'?")
         for person_id in person_ids:
-            person = people[person_id]
+            person = person_info(person_id)
             name = person["name"]
             birth = person["birth"]
             print(f"ID: {person_id}, Name: {name}, Birth: {birth}")
@@ -146,11 +357,88 @@ def person_id_for_name(name):
         return person_ids[0]
 
 
+def disambiguate(person_ids, policy):
+    """
+    Picks one of person_ids without prompting: the person with the most
+    movies ("most-credited"), the smallest id ("first"), or nobody if
+    there is more than one ("skip").
+    """
+    if policy not in POLICIES:
+        raise ValueError(f"unknown policy: {policy}")
+    if len(person_ids) == 0:
+        return None
+    if len(person_ids) == 1:
+        return person_ids[0]
+    if policy == "most-credited":
+        return min(person_ids, key=lambda person_id: (-credits(person_id), person_id))
+    if policy == "first":
+        return min(person_ids)
+    return None
+
+
+def disambiguate_positions(positions, policy):
+    """
+    Like disambiguate, for positions in the name index. Credits are read
+    from name_credits, so only the people tied for the most credits are
+    looked up by id.
+    """
+    if policy not in POLICIES:
+        raise ValueError(f"unknown policy: {policy}")
+    if len(positions) == 0:
+        return None
+    if len(positions) == 1:
+        return name_ids[positions[0]]
+    if policy == "most-credited":
+        most = max(name_credits[i] for i in positions)
+        return min(name_ids[i] for i in positions if name_credits[i] == most)
+    if policy == "first":
+        return min(name_ids[i] for i in positions)
+    return None
+
+
+def credits(person_id):
+    """
+    Returns the number of movies a person starred in.
+    """
+    if graph is not None:
+        index = graph.person_index(person_id)
+        return graph.person_offsets[index + 1] - graph.person_offsets[index]
+    return len(people[person_id]["movies"])
+
+
+def search_names(query, limit=10):
+    """
+    Returns up to limit person_ids whose names match query exactly, by
+    prefix, or approximately, using the name index.
+    """
+    if name_index is None:
+        raise RuntimeError("name index not loaded")
+    return [name_ids[i] for i in name_index.lookup(query, limit)]
+
+
+def person_ids_for_name(name):
+    """
+    Returns the list of IMDB ids of every person with the given name.
+    """
+    if graph is not None:
+        return [graph.person_ids[index] for index in graph.people_named(name)]
+    return list(names.get(name.lower(), set()))
+
+
 def neighbors_for_person(person_id):
     """
     Returns (movie_id, person_id) pairs for people
     who starred with a given person.
+
+    With a precomputed adjacency, returns the shared read-only tuple
+    holding one pair per co-star.
     """
+    if adjacency is not None:
+        return adjacency[person_id]
+    if graph is not None:
+        return {(graph.movie_ids[movie], graph.person_ids[person])
+                for movie, person in graph.neighbors(graph.person_index(person_id))}
+
     movie_ids = people[person_id]["movies"]
     neighbors = set()
     for movie_id in movie_ids:
@@ -159,5 +447,23 @@ def neighbors_for_person(person_id):
     return neighbors
 
 
+def person_info(person_id):
+    """
+    Returns a dictionary with the name and birth of a person.
+    """
+    if graph is not None:
+        return graph.person(graph.person_index(person_id))
+    return people[person_id]
+
+
+def movie_info(movie_id):
+    """
+    Returns a dictionary with the title and year of a movie.
+    """
+    if graph is not None:
+        return graph.movie(graph.movie_index(movie_id))
+    return movies[movie_id]
+
+
 if __name__ == "__main__":
     main()
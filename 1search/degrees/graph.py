@@ -0,0 +1,487 @@
+import bisect
+import csv
+import json
+import mmap
+import os
+import sys
+from array import array
+
+# Bump whenever the snapshot layout changes so stale files are rebuilt
+SNAPSHOT_VERSION = 1
+SNAPSHOT_MAGIC = b"DEGSNAP\0"
+SNAPSHOT_NAME = "degrees.snapshot"
+SOURCES = ("people.csv", "movies.csv", "stars.csv")
+
+ARRAYS = ("person_offsets", "person_movies", "movie_offsets", "movie_stars")
+STRINGS = ("person_ids", "person_names", "person_births",
+           "movie_ids", "movie_titles", "movie_years")
+
+
+class StarGraph():
+    """
+    Compact star graph: people and movies are mapped to dense integer
+    indices and the bipartite person <-> movie relation is stored as two
+    CSR (compressed sparse row) adjacency lists held in flat int arrays.
+    """
+
+    def __init__(self):
+        # Index -> original IMDB id and attributes; lists while loading,
+        # packed into StringTables by _build_index
+        self.person_ids = []
+        self.person_names = []
+        self.person_births = []
+        self.movie_ids = []
+        self.movie_titles = []
+        self.movie_years = []
+
+        # person i starred in person_movies[person_offsets[i]:person_offsets[i + 1]]
+        self.person_offsets = array("i", [0])
+        self.person_movies = array("i")
+
+        # movie m stars movie_stars[movie_offsets[m]:movie_offsets[m + 1]]
+        self.movie_offsets = array("i", [0])
+        self.movie_stars = array("i")
+
+        # Original id -> index, lower-cased name -> person indices, as
+        # SortedIndex lookups once built
+        self._person_index = {}
+        self._movie_index = {}
+        self._names = {}
+
+        # Optional precomputed person -> person adjacency, one representative
+        # movie per co-star: costar_people/costar_movies[costar_offsets[i]:...]
+        self.costar_offsets = None
+        self.costar_people = None
+        self.costar_movies = None
+
+        # Open snapshot file backing the arrays above, if any, and the
+        # path of a snapshot file holding this graph
+        self._mmap = None
+        self.snapshot_path = None
+
+    @classmethod
+    def load(cls, directory, cache=True):
+        """
+        Load a StarGraph for directory, memory-mapping its binary snapshot
+        when it is up to date with the CSV files. Otherwise parse the CSV
+        files and, if cache is True, write a fresh snapshot next to them.
+        """
+        path = os.path.join(directory, SNAPSHOT_NAME)
+        sources = source_stats(directory)
+        if cache:
+            graph = cls.from_snapshot(path, sources)
+            if graph is not None:
+                return graph
+
+        graph = cls.from_csv(directory)
+        if cache:
+            try:
+                graph.save_snapshot(path, sources)
+                graph.snapshot_path = path
+            except OSError:
+                pass
+        return graph
+
+    @classmethod
+    def from_csv(cls, directory):
+        """
+        Load people, movies and stars CSV files into a new StarGraph.
+        """
+        graph = cls()
+
+        with open(f"{directory}/people.csv", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                graph.person_ids.append(row["id"])
+                graph.person_names.append(row["name"])
+                graph.person_births.append(row["birth"])
+
+        with open(f"{directory}/movies.csv", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                graph.movie_ids.append(row["id"])
+                graph.movie_titles.append(row["title"])
+                graph.movie_years.append(row["year"])
+
+        # Temporary id -> index dicts for reading edges; they are dropped
+        # before the lists are packed into string tables
+        person_index = {person_id: i for i, person_id in enumerate(graph.person_ids)}
+        movie_index = {movie_id: i for i, movie_id in enumerate(graph.movie_ids)}
+
+        # Collect edges as two parallel int arrays, skipping unknown ids
+        edge_people = array("i")
+        edge_movies = array("i")
+        with open(f"{directory}/stars.csv", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            for row in reader:
+                person = person_index.get(row["person_id"])
+                movie = movie_index.get(row["movie_id"])
+                if person is None or movie is None:
+                    continue
+                edge_people.append(person)
+                edge_movies.append(movie)
+
+        del person_index, movie_index
+        graph.set_edges(edge_people, edge_movies)
+        graph._build_index()
+        return graph
+
+    def set_edges(self, edge_people, edge_movies):
+        """
+        Builds both CSR adjacency lists from parallel arrays of
+        (person index, movie index) star edges.
+        """
+        self.person_offsets, self.person_movies = build_csr(
+            len(self.person_ids), edge_people, edge_movies)
+        self.movie_offsets, self.movie_stars = build_csr(
+            len(self.movie_ids), edge_movies, edge_people)
+
+    def _build_index(self):
+        """
+        Packs the attribute lists into string tables and builds sorted id
+        and name lookups over them.
+        """
+        person_order = sorted_order(self.person_ids)
+        movie_order = sorted_order(self.movie_ids)
+        name_order = sorted_order(self.person_names, str.lower)
+        for name in STRINGS:
+            values = getattr(self, name)
+            if not isinstance(values, StringTable):
+                setattr(self, name, StringTable(*encode_strings(values)))
+        self._person_index = SortedIndex(self.person_ids, person_order)
+        self._movie_index = SortedIndex(self.movie_ids, movie_order)
+        self._names = SortedIndex(self.person_names, name_order, key=str.lower, unique=False)
+
+    @classmethod
+    def from_snapshot(cls, path, sources=None):
+        """
+        Memory-maps a snapshot written by save_snapshot. Returns None if
+        the file is missing, truncated, from another version or platform,
+        or was built from CSV files whose mtime or size differ from sources.
+        """
+        try:
+            f = open(path, "rb")
+        except OSError:
+            return None
+        with f:
+            if f.read(len(SNAPSHOT_MAGIC)) != SNAPSHOT_MAGIC:
+                return None
+            header_size = int.from_bytes(f.read(4), "little")
+            try:
+                header = json.loads(f.read(header_size))
+            except ValueError:
+                return None
+            if (header.get("version") != SNAPSHOT_VERSION
+                    or header.get("byteorder") != sys.byteorder
+                    or (sources is not None and header.get("sources") != sources)):
+                return None
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        view = memoryview(buffer)
+
+        def section(name):
+            offset, length, typecode = header["sections"][name]
+            start = header["data"] + offset
+            # A truncated or corrupt file must not map past its end
+            if offset < 0 or length < 0 or start + length > len(buffer):
+                raise ValueError(f"section {name} lies outside the snapshot")
+            return view[start:start + length].cast(typecode)
+
+        graph = cls()
+        graph._mmap = buffer
+        graph.snapshot_path = path
+        try:
+            for name in ARRAYS:
+                setattr(graph, name, section(name))
+            for name in STRINGS:
+                setattr(graph, name, StringTable(
+                    section(name + ".offsets"), section(name + ".data")))
+            graph._person_index = SortedIndex(graph.person_ids, section("person_order"))
+            graph._movie_index = SortedIndex(graph.movie_ids, section("movie_order"))
+            graph._names = SortedIndex(
+                graph.person_names, section("name_order"), key=str.lower, unique=False)
+        except (KeyError, TypeError, ValueError):
+            return None
+        return graph
+
+    def save_snapshot(self, path, sources=None):
+        """
+        Writes the graph as a versioned binary snapshot: a JSON header
+        followed by 8-byte aligned int arrays, string tables and sorted
+        lookup orders that from_snapshot can memory-map without parsing.
+        """
+        sections = []
+        for name in ARRAYS:
+            sections.append((name, array("i", getattr(self, name))))
+        for name in STRINGS:
+            offsets, data = encode_strings(getattr(self, name))
+            sections.append((name + ".offsets", offsets))
+            sections.append((name + ".data", data))
+        sections.append(("person_order", array("i", self._person_index.order)))
+        sections.append(("movie_order", array("i", self._movie_index.order)))
+        sections.append(("name_order", array("i", self._names.order)))
+
+        table = {}
+        offset = 0
+        for name, data in sections:
+            typecode = data.typecode if isinstance(data, array) else "B"
+            length = len(data) * (data.itemsize if isinstance(data, array) else 1)
+            table[name] = [offset, length, typecode]
+            offset = align(offset + length)
+
+        header = {
+            "version": SNAPSHOT_VERSION,
+            "byteorder": sys.byteorder,
+            "sources": sources,
+            "sections": table,
+            "data": 0,
+        }
+        # The data start depends on the header size, which depends on it
+        encoded = json.dumps(header).encode()
+        while True:
+            header["data"] = align(len(SNAPSHOT_MAGIC) + 4 + len(encoded))
+            updated = json.dumps(header).encode()
+            settled = len(updated) == len(encoded)
+            encoded = updated
+            if settled:
+                break
+
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "wb") as f:
+            f.write(SNAPSHOT_MAGIC)
+            f.write(len(encoded).to_bytes(4, "little"))
+            f.write(encoded)
+            for name, data in sections:
+                f.write(bytes(header["data"] + table[name][0] - f.tell()))
+                f.write(data)
+        os.replace(temporary, path)
+
+    def person_count(self):
+        return len(self.person_ids)
+
+    def movie_count(self):
+        return len(self.movie_ids)
+
+    def person_index(self, person_id):
+        """
+        Returns the dense index of an IMDB person id, or None.
+        """
+        return self._person_index.get(person_id)
+
+    def movie_index(self, movie_id):
+        """
+        Returns the dense index of an IMDB movie id, or None.
+        """
+        return self._movie_index.get(movie_id)
+
+    def people_named(self, name):
+        """
+        Returns the list of person indices with the given (case-insensitive) name.
+        """
+        return self._names.get(name.lower(), [])
+
+    def person(self, index):
+        return {
+            "name": self.person_names[index],
+            "birth": self.person_births[index],
+        }
+
+    def movie(self, index):
+        return {
+            "title": self.movie_titles[index],
+            "year": self.movie_years[index],
+        }
+
+    def movies_of(self, person):
+        """
+        Returns the movie indices a person starred in.
+        """
+        return self.person_movies[self.person_offsets[person]:self.person_offsets[person + 1]]
+
+    def stars_of(self, movie):
+        """
+        Returns the person indices starring in a movie.
+        """
+        return self.movie_stars[self.movie_offsets[movie]:self.movie_offsets[movie + 1]]
+
+    def build_costars(self):
+        """
+        Precomputes the deduplicated co-star adjacency, keeping the first
+        movie linking each pair of people and leaving out the person
+        themselves. Afterwards neighbors reads it instead of expanding
+        every movie's full cast.
+        """
+        offsets = array("i", [0])
+        costar_people = array("i")
+        costar_movies = array("i")
+        for person in range(self.person_count()):
+            seen = {person}
+            for movie, star in self._star_neighbors(person):
+                if star not in seen:
+                    seen.add(star)
+                    costar_people.append(star)
+                    costar_movies.append(movie)
+            offsets.append(len(costar_people))
+        self.costar_offsets = offsets
+        # Slicing memoryviews shares the buffer instead of copying it
+        self.costar_people = memoryview(costar_people)
+        self.costar_movies = memoryview(costar_movies)
+
+    def neighbors(self, person):
+        """
+        Returns an iterator of (movie, person) index pairs for people who
+        starred with a given person.
+        """
+        if self.costar_offsets is not None:
+            start = self.costar_offsets[person]
+            end = self.costar_offsets[person + 1]
+            return zip(self.costar_movies[start:end], self.costar_people[start:end])
+        return self._star_neighbors(person)
+
+    def _star_neighbors(self, person):
+        person_offsets = self.person_offsets
+        person_movies = self.person_movies
+        movie_offsets = self.movie_offsets
+        movie_stars = self.movie_stars
+        for i in range(person_offsets[person], person_offsets[person + 1]):
+            movie = person_movies[i]
+            for j in range(movie_offsets[movie], movie_offsets[movie + 1]):
+                yield (movie, movie_stars[j])
+
+    def nbytes(self):
+        """
+        Returns the number of bytes held by the CSR arrays.
+        """
+        arrays = [self.person_offsets, self.person_movies,
+                  self.movie_offsets, self.movie_stars]
+        if self.costar_offsets is not None:
+            arrays += [self.costar_offsets, self.costar_people, self.costar_movies]
+        return sum(a.itemsize * len(a) for a in arrays)
+
+
+def build_csr(rows, sources, targets):
+    """
+    Builds (offsets, columns) CSR arrays for `rows` rows from parallel
+    arrays of edge sources and targets using a counting sort.
+    """
+    offsets = array("i", [0]) * (rows + 1)
+    for source in sources:
+        offsets[source + 1] += 1
+    for i in range(rows):
+        offsets[i + 1] += offsets[i]
+
+    columns = array("i", [0]) * len(sources)
+    cursor = offsets[:-1]
+    for source, target in zip(sources, targets):
+        columns[cursor[source]] = target
+        cursor[source] += 1
+    return offsets, columns
+
+
+class StringTable():
+    """
+    Read-only sequence of strings stored as UTF-8 bytes, where string i
+    is data[offsets[i]:offsets[i + 1]].
+    """
+
+    def __init__(self, offsets, data):
+        self.offsets = offsets
+        self.data = data
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("string table index out of range")
+        return bytes(self.data[self.offsets[index]:self.offsets[index + 1]]).decode("utf-8")
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+class SortedIndex():
+    """
+    Dict-like lookup from key(values[i]) to i by binary search over a
+    precomputed order of indices sorted by key. If unique is False, get
+    returns the list of all matching indices.
+    """
+
+    def __init__(self, values, order, key=None, unique=True):
+        self.values = values
+        self.order = order
+        self.key = key
+        self.unique = unique
+
+    def _key(self, position):
+        value = self.values[self.order[position]]
+        return self.key(value) if self.key is not None else value
+
+    def get(self, key, default=None):
+        positions = _KeyView(self)
+        low = bisect.bisect_left(positions, key)
+        if self.unique:
+            if low < len(positions) and positions[low] == key:
+                return self.order[low]
+            return default
+        high = bisect.bisect_right(positions, key, low)
+        if low == high:
+            return default
+        return [self.order[i] for i in range(low, high)]
+
+
+class _KeyView():
+    """
+    Sequence of the sorted keys of a SortedIndex, for use with bisect.
+    """
+
+    def __init__(self, index):
+        self.index = index
+
+    def __len__(self):
+        return len(self.index.order)
+
+    def __getitem__(self, position):
+        return self.index._key(position)
+
+
+def encode_strings(strings):
+    """
+    Returns (offsets, data) arrays for a StringTable of strings.
+    """
+    offsets = array("q", [0])
+    data = bytearray()
+    for string in strings:
+        data += string.encode("utf-8")
+        offsets.append(len(data))
+    return offsets, data
+
+
+def sorted_order(values, key=None):
+    """
+    Returns the array of indices of values sorted by key(value).
+    """
+    if key is None:
+        return array("i", sorted(range(len(values)), key=values.__getitem__))
+    return array("i", sorted(range(len(values)), key=lambda i: key(values[i])))
+
+
+def source_stats(directory):
+    """
+    Returns {file: [mtime_ns, size]} for the CSV files a snapshot is built from.
+    """
+    stats = {}
+    for name in SOURCES:
+        try:
+            stat = os.stat(os.path.join(directory, name))
+        except OSError:
+            continue
+        stats[name] = [stat.st_mtime_ns, stat.st_size]
+    return stats
+
+
+def align(offset, boundary=8):
+    return (offset + boundary - 1) // boundary * boundary
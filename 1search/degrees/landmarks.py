@@ -0,0 +1,275 @@
+"""
+Landmark distance index for instant degree-of-separation bounds.
+
+Usage: python landmarks.py [--k K] directory [source_name target_name]
+
+Builds (or reuses) the index for directory, then prints the bounds and
+the exact A* answer for the two named people, if given.
+"""
+
+import argparse
+import heapq
+import json
+import mmap
+import os
+import sys
+import time
+from array import array
+
+from graph import StarGraph, source_stats
+from parallel import bfs_tree
+from util import Node, PriorityFrontier
+
+# Bump whenever the index layout changes so stale files are rebuilt
+LANDMARKS_VERSION = 1
+LANDMARKS_MAGIC = b"DEGLAND\0"
+LANDMARKS_NAME = "degrees.landmarks"
+
+# Distances are stored as signed bytes; -1 marks unreachable people and
+# SATURATED marks people at least that far away
+UNREACHABLE = -1
+SATURATED = 127
+
+
+class LandmarkIndex():
+    """
+    BFS distances from k high-degree landmark people to every person,
+    stored as one flat int8 array (landmark-major).
+    """
+
+    def __init__(self, graph, landmarks, distances):
+        self.graph = graph
+        self.landmarks = landmarks
+        self.distances = distances
+        self.people = graph.person_count()
+        self._mmap = None
+
+    @classmethod
+    def build(cls, graph, k=16):
+        """
+        Runs one full BFS from each of the k people with the most co-stars.
+        """
+        costars = array("i", [0]) * graph.person_count()
+        for person in range(graph.person_count()):
+            for movie in graph.movies_of(person):
+                costars[person] += graph.movie_offsets[movie + 1] - graph.movie_offsets[movie] - 1
+        landmarks = heapq.nlargest(k, range(graph.person_count()), key=costars.__getitem__)
+
+        distances = array("b")
+        for landmark in landmarks:
+            tree = bfs_tree(graph, landmark)[0]
+            distances.extend(min(distance, SATURATED) for distance in tree)
+        return cls(graph, landmarks, distances)
+
+    @classmethod
+    def load(cls, graph, directory, k=16):
+        """
+        Memory-maps the index stored next to the CSV files in directory if
+        it matches k and the current CSV files, else builds and saves it.
+        """
+        path = os.path.join(directory, LANDMARKS_NAME)
+        sources = source_stats(directory)
+        index = cls.from_file(graph, path, sources)
+        if index is not None and len(index.landmarks) == k:
+            return index
+
+        index = cls.build(graph, k)
+        try:
+            index.save(path, sources)
+        except OSError:
+            pass
+        return index
+
+    @classmethod
+    def from_file(cls, graph, path, sources=None):
+        """
+        Memory-maps an index written by save. Returns None if the file is
+        missing, truncated, from another version, or built from different
+        CSV files.
+        """
+        try:
+            f = open(path, "rb")
+        except OSError:
+            return None
+        with f:
+            if f.read(len(LANDMARKS_MAGIC)) != LANDMARKS_MAGIC:
+                return None
+            header_size = int.from_bytes(f.read(4), "little")
+            try:
+                header = json.loads(f.read(header_size))
+            except ValueError:
+                return None
+            if (header.get("version") != LANDMARKS_VERSION
+                    or header.get("people") != graph.person_count()
+                    or (sources is not None and header.get("sources") != sources)):
+                return None
+            buffer = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        start = len(LANDMARKS_MAGIC) + 4 + header_size
+        try:
+            landmarks = [graph.person_index(person_id) for person_id in header["landmarks"]]
+        except (KeyError, TypeError):
+            return None
+        # A truncated file would leave some landmark's distances unmapped
+        if None in landmarks or len(buffer) - start < len(landmarks) * graph.person_count():
+            return None
+        index = cls(graph, landmarks, memoryview(buffer)[start:].cast("b"))
+        index._mmap = buffer
+        return index
+
+    def save(self, path, sources=None):
+        header = json.dumps({
+            "version": LANDMARKS_VERSION,
+            "people": self.people,
+            "sources": sources,
+            "landmarks": [self.graph.person_ids[landmark] for landmark in self.landmarks],
+        }).encode()
+        temporary = f"{path}.{os.getpid()}.tmp"
+        with open(temporary, "wb") as f:
+            f.write(LANDMARKS_MAGIC)
+            f.write(len(header).to_bytes(4, "little"))
+            f.write(header)
+            f.write(self.distances)
+        os.replace(temporary, path)
+
+    def bounds(self, a, b):
+        """
+        Returns (lower, upper) bounds on the degrees of separation between
+        person indices a and b by the triangle inequality; upper is None if
+        no landmark reaches both within SATURATED steps. Returns None if a
+        landmark reaches exactly one of them, i.e. they are provably not
+        connected.
+
+        A saturated distance only says "at least SATURATED", which still
+        gives a valid lower bound but no upper one.
+        """
+        lower = 0
+        upper = None
+        distances = self.distances
+        for offset in range(0, len(self.landmarks) * self.people, self.people):
+            da = distances[offset + a]
+            db = distances[offset + b]
+            if da == UNREACHABLE and db == UNREACHABLE:
+                continue
+            if da == UNREACHABLE or db == UNREACHABLE:
+                return None
+            lower = max(lower, abs(da - db))
+            if da == SATURATED or db == SATURATED:
+                continue
+            if upper is None or da + db < upper:
+                upper = da + db
+        return lower, upper
+
+    def heuristic(self, target):
+        """
+        Returns an admissible, consistent h(person) for A* towards target.
+        """
+        distances = self.distances
+        offsets = [offset for offset in range(0, len(self.landmarks) * self.people, self.people)
+                   if distances[offset + target] != UNREACHABLE]
+        targets = [distances[offset + target] for offset in offsets]
+
+        def h(person):
+            best = 0
+            for offset, dt in zip(offsets, targets):
+                d = abs(distances[offset + person] - dt)
+                if d > best:
+                    best = d
+            return best
+        return h
+
+    def search(self, source, target):
+        """
+        Exact A* search between person indices, guided by the landmark lower
+        bound. Returns the list of (movie, person) index pairs, or None.
+        """
+        if source == target:
+            return list()
+        bounds = self.bounds(source, target)
+        if bounds is None:
+            return None
+        upper = bounds[1]
+
+        h = self.heuristic(target)
+        estimates = {}
+
+        def priority(node):
+            # Among equal f = g + h prefer deeper nodes, which are closer to target
+            estimate = estimates.get(node.state)
+            if estimate is None:
+                estimate = estimates[node.state] = h(node.state)
+            return (node.cost + estimate, -node.cost)
+
+        frontier = PriorityFrontier(priority)
+        frontier.add(Node(source, None, None, 0))
+        best = {source: 0}
+        explored = set()
+
+        while not frontier.empty():
+            node = frontier.remove()
+            if node.state == target:
+                result = list()
+                while node.parent is not None:
+                    result.insert(0, node.action)
+                    node = node.parent
+                return result
+            if node.state in explored:
+                continue
+            explored.add(node.state)
+
+            cost = node.cost + 1
+            for movie, person in self.graph.neighbors(node.state):
+                if person in explored or best.get(person, cost + 1) <= cost:
+                    continue
+                best[person] = cost
+                child = Node(person, node, (movie, person), cost)
+                # No path through child can beat the landmark upper bound
+                if upper is not None and priority(child)[0] > upper:
+                    continue
+                frontier.add(child)
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("directory")
+    parser.add_argument("names", nargs="*", metavar="name")
+    parser.add_argument("--k", type=int, default=16)
+    args = parser.parse_args()
+    if len(args.names) not in (0, 2):
+        sys.exit("Give either no names or a source and a target name.")
+
+    graph = StarGraph.load(args.directory)
+    start = time.perf_counter()
+    index = LandmarkIndex.load(graph, args.directory, args.k)
+    print(f"Landmark index ready in {time.perf_counter() - start:.3f}s", file=sys.stderr)
+    if not args.names:
+        return
+
+    people = []
+    for name in args.names:
+        matches = graph.people_named(name)
+        if not matches:
+            sys.exit(f"Person not found: {name}")
+        people.append(matches[0])
+
+    start = time.perf_counter()
+    bounds = index.bounds(*people)
+    elapsed = time.perf_counter() - start
+    if bounds is None:
+        print(f"Not connected ({elapsed * 1000:.2f}ms).")
+        return
+    lower, upper = bounds
+    print(f"Between {lower} and {'?' if upper is None else upper} degrees ({elapsed * 1000:.2f}ms).")
+
+    start = time.perf_counter()
+    path = index.search(*people)
+    elapsed = time.perf_counter() - start
+    if path is None:
+        print(f"Not connected ({elapsed * 1000:.2f}ms).")
+    else:
+        print(f"{len(path)} degrees of separation ({elapsed * 1000:.2f}ms).")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import bisect
+from array import array
+from collections import Counter
+
+# Most positions counted per fuzzy lookup: the rarest trigrams' posting
+# lists are counted first, and common trigrams beyond this are skipped
+# since they match too many names to narrow the search
+POSTING_BUDGET = 6000
+
+# Candidates rescored exactly after trigram overlap counting
+CANDIDATES = 64
+
+# Sorts after every other character, so key + LAST_CHARACTER bounds the
+# keys starting with key
+LAST_CHARACTER = chr(0x10FFFF)
+
+
+class NameIndex():
+    """
+    Case-insensitive index over a sequence of names supporting exact,
+    prefix and typo-tolerant (trigram) lookup. Lookups return positions
+    in the original sequence.
+    """
+
+    def __init__(self, names):
+        self.names = names
+        order = sorted(range(len(names)), key=lambda i: names[i].lower())
+        self.order = array("i", order)
+        self.keys = [names[i].lower() for i in order]
+
+        postings = {}
+        for position in range(len(names)):
+            for trigram in trigrams(names[position]):
+                posting = postings.get(trigram)
+                if posting is None:
+                    posting = postings[trigram] = array("i")
+                posting.append(position)
+        self.postings = postings
+
+    def exact(self, name):
+        """
+        Returns the positions of every name equal to name, ignoring case.
+        """
+        key = name.lower()
+        low = bisect.bisect_left(self.keys, key)
+        high = bisect.bisect_right(self.keys, key, low)
+        return list(self.order[low:high])
+
+    def prefix(self, prefix, limit=10):
+        """
+        Returns up to limit positions (all with None) of names starting
+        with prefix, in alphabetical order.
+        """
+        low, high = self.span(prefix)
+        if limit is not None:
+            high = min(high, low + limit)
+        return list(self.order[low:high])
+
+    def span(self, prefix):
+        """
+        Returns the (low, high) range of sorted keys starting with prefix,
+        found by bisection rather than by scanning the matches.
+        """
+        key = prefix.lower()
+        low = bisect.bisect_left(self.keys, key)
+        high = bisect.bisect_right(self.keys, key + LAST_CHARACTER, low)
+        return low, high
+
+    def fuzzy(self, name, limit=10, threshold=0.4):
+        """
+        Returns up to limit positions of the names most similar to name,
+        best first, by trigram Dice similarity of at least threshold.
+        """
+        query = trigrams(name)
+        if not query:
+            return []
+        postings = sorted(
+            (self.postings[trigram] for trigram in query if trigram in self.postings),
+            key=len)
+        if not postings:
+            return []
+
+        # Count shared trigrams using the rarest posting lists
+        counts = Counter(postings[0])
+        budget = POSTING_BUDGET - len(postings[0])
+        for posting in postings[1:]:
+            budget -= len(posting)
+            if budget < 0:
+                break
+            counts.update(posting)
+
+        # Names sharing a single trigram rarely clear the threshold; dropping
+        # them first keeps the top-candidates selection small
+        if len(counts) > CANDIDATES:
+            shared = Counter({position: count for position, count in counts.items() if count > 1})
+            if shared:
+                counts = shared
+
+        scored = []
+        for position, _ in counts.most_common(CANDIDATES):
+            candidate = trigrams(self.names[position])
+            score = 2 * len(query & candidate) / (len(query) + len(candidate))
+            if score >= threshold:
+                scored.append((-score, position))
+        scored.sort()
+        return [position for _, position in scored[:limit]]
+
+    def lookup(self, name, limit=10):
+        """
+        Returns exact matches if any, else prefix matches, else fuzzy matches.
+        """
+        return (self.exact(name)
+                or self.prefix(name, limit)
+                or self.fuzzy(name, limit))
+
+
+def trigrams(name):
+    """
+    Returns the set of lower-cased character trigrams of a name, padded
+    so that word starts and ends form their own trigrams.
+    """
+    padded = "  " + " ".join(name.lower().split()) + " "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
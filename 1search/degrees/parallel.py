@@ -0,0 +1,201 @@
+"""
+Computes degrees of separation for many pairs across CPU cores.
+
+Usage: python parallel.py [--processes N] [--paths] directory pairs
+
+Reads tab-separated "source_id<TAB>target_id" person id pairs and writes
+"source_id<TAB>target_id<TAB>degrees" lines, with degrees empty if the
+two people are not connected. With --paths, each line also gets a column
+of comma-separated "movie_id:person_id" steps of a shortest path.
+"""
+
+import argparse
+import multiprocessing
+import os
+import sys
+import tempfile
+import time
+from array import array
+from collections import deque
+
+from graph import StarGraph
+
+# Graph opened by each worker process in init_worker
+worker_graph = None
+
+
+def bfs_tree(graph, source):
+    """
+    Breadth-first search from a person index over the whole graph.
+    Returns (distance, parent_person, parent_movie) arrays indexed by
+    person, where distance is -1 for people not connected to source.
+    """
+    distance = array("i", [-1]) * graph.person_count()
+    parent_person = array("i", [-1]) * graph.person_count()
+    parent_movie = array("i", [-1]) * graph.person_count()
+    # Each movie's cast only needs scanning the first time it is reached
+    seen_movie = bytearray(graph.movie_count())
+
+    person_offsets = graph.person_offsets
+    person_movies = graph.person_movies
+    movie_offsets = graph.movie_offsets
+    movie_stars = graph.movie_stars
+
+    distance[source] = 0
+    queue = deque([source])
+    while queue:
+        person = queue.popleft()
+        depth = distance[person] + 1
+        for i in range(person_offsets[person], person_offsets[person + 1]):
+            movie = person_movies[i]
+            if seen_movie[movie]:
+                continue
+            seen_movie[movie] = 1
+            for j in range(movie_offsets[movie], movie_offsets[movie + 1]):
+                star = movie_stars[j]
+                if distance[star] < 0:
+                    distance[star] = depth
+                    parent_person[star] = person
+                    parent_movie[star] = movie
+                    queue.append(star)
+    return distance, parent_person, parent_movie
+
+
+def path_from_tree(tree, target):
+    """
+    Returns the list of (movie, person) index pairs from the source of
+    a bfs_tree to target, or None if target is not connected.
+    """
+    distance, parent_person, parent_movie = tree
+    if distance[target] < 0:
+        return None
+    result = []
+    while parent_person[target] >= 0:
+        result.append((parent_movie[target], target))
+        target = parent_person[target]
+    result.reverse()
+    return result
+
+
+def reverse_path(path, source):
+    """
+    Returns the path from the last person of path back to source, where
+    path is a list of (movie, person) index pairs leading from source.
+    """
+    people = [source] + [person for _, person in path]
+    return [(path[i][0], people[i]) for i in reversed(range(len(path)))]
+
+
+def init_worker(path):
+    """
+    Memory-maps the shared snapshot once per worker, so every worker reads
+    the same physical pages instead of receiving a pickled copy.
+    """
+    global worker_graph
+    worker_graph = StarGraph.from_snapshot(path)
+
+
+def solve(task):
+    """
+    Returns the distances (or, with paths, the paths) from one source
+    index to each target index, reusing a single BFS tree for all of them.
+    """
+    source, targets, paths = task
+    tree = bfs_tree(worker_graph, source)
+    if paths:
+        return [path_from_tree(tree, target) for target in targets]
+    distance = tree[0]
+    return [distance[target] if distance[target] >= 0 else None for target in targets]
+
+
+def distances_for_pairs(graph, pairs, processes=None, paths=False):
+    """
+    Returns the degrees of separation (or None) for each (source, target)
+    person index pair, fanning out one task per distinct source across a
+    process pool that shares the graph through its snapshot file. With
+    paths, returns a shortest path as a list of (movie, person) index
+    pairs (or None) for each pair instead.
+
+    Degrees of separation are symmetric, so pairs are searched from
+    whichever side has fewer distinct people: many people against a few
+    hubs take one BFS per hub.
+    """
+    flipped = len({target for _, target in pairs}) < len({source for source, _ in pairs})
+    targets_by_source = {}
+    for position, (source, target) in enumerate(pairs):
+        if flipped:
+            source, target = target, source
+        targets_by_source.setdefault(source, []).append((position, target))
+    tasks = [(source, [target for _, target in entries], paths)
+             for source, entries in targets_by_source.items()]
+
+    path = graph.snapshot_path
+    temporary = None
+    if path is None:
+        handle, temporary = tempfile.mkstemp(suffix=".snapshot")
+        os.close(handle)
+        graph.save_snapshot(temporary)
+        path = temporary
+
+    results = [None] * len(pairs)
+    workers = processes or os.cpu_count() or 1
+    chunksize = max(1, len(tasks) // (4 * workers))
+    try:
+        with multiprocessing.Pool(workers, initializer=init_worker, initargs=(path,)) as pool:
+            answers = pool.imap(solve, tasks, chunksize)
+            for (source, entries), answers_for_source in zip(targets_by_source.items(), answers):
+                for (position, _), answer in zip(entries, answers_for_source):
+                    if flipped and paths and answer is not None:
+                        answer = reverse_path(answer, source)
+                    results[position] = answer
+    finally:
+        if temporary is not None:
+            os.remove(temporary)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("directory")
+    parser.add_argument("pairs")
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--paths", action="store_true", help="also write a shortest path per pair")
+    args = parser.parse_args()
+
+    print("Loading data...", file=sys.stderr)
+    graph = StarGraph.load(args.directory)
+    print("Data loaded.", file=sys.stderr)
+
+    ids = []
+    pairs = []
+    with open(args.pairs, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            source_id, target_id = line.rstrip("\r\n").split("\t")
+            source = graph.person_index(source_id)
+            target = graph.person_index(target_id)
+            if source is None or target is None:
+                sys.exit(f"Person not found: {source_id if source is None else target_id}")
+            ids.append((source_id, target_id))
+            pairs.append((source, target))
+
+    start = time.perf_counter()
+    answers = distances_for_pairs(graph, pairs, args.processes, args.paths)
+    elapsed = time.perf_counter() - start
+
+    for (source_id, target_id), answer in zip(ids, answers):
+        if not args.paths:
+            print(f"{source_id}\t{target_id}\t{'' if answer is None else answer}")
+        elif answer is None:
+            print(f"{source_id}\t{target_id}\t\t")
+        else:
+            steps = ",".join(f"{graph.movie_ids[movie]}:{graph.person_ids[person]}"
+                             for movie, person in answer)
+            print(f"{source_id}\t{target_id}\t{len(answer)}\t{steps}")
+    rate = len(pairs) / elapsed if elapsed > 0 else 0.0
+    print(f"{len(pairs)} pairs in {elapsed:.3f}s ({rate:.1f} pairs/sec)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,19 +1,28 @@
+import heapq
+import itertools
+from collections import deque
+
+
 class Node():
-    def __init__(self, state, parent, action):
+    def __init__(self, state, parent, action, cost=0):
         self.state = state
         self.parent = parent
         self.action = action
+        self.cost = cost
 
 
 class StackFrontier():
     def __init__(self):
-        self.frontier = []
+        self.frontier = deque()
+        # Maps each state in the frontier to how many nodes hold it
+        self.states = {}
 
     def add(self, node):
         self.frontier.append(node)
+        self._track(node.state)
 
     def contains_state(self, state):
-        return any(node.state == state for node in self.frontier)
+        return state in self.states
 
     def empty(self):
         return len(self.frontier) == 0
@@ -22,10 +31,20 @@ class StackFrontier():
         if self.empty():
             raise Exception("empty frontier")
         else:
-            node = self.frontier[-1]
-            self.frontier = self.frontier[:-1]
+            node = self.frontier.pop()
+            self._untrack(node.state)
             return node
 
+    def _track(self, state):
+        self.states[state] = self.states.get(state, 0) + 1
+
+    def _untrack(self, state):
+        count = self.states[state] - 1
+        if count:
+            self.states[state] = count
+        else:
+            del self.states[state]
+
 
 class QueueFrontier(StackFrontier):
 
@@ -33,6 +52,33 @@ class QueueFrontier(StackFrontier):
         if self.empty():
             raise Exception("empty frontier")
         else:
-            node = self.frontier[0]
-            self.frontier = self.frontier[1:]
+            node = self.frontier.popleft()
+            self._untrack(node.state)
+            return node
+
+
+class PriorityFrontier(StackFrontier):
+    """
+    Frontier that removes the node with the lowest priority first.
+    By default the priority is the node's path cost (uniform-cost search);
+    pass priority=lambda node: node.cost + h(node.state) for A*.
+    """
+
+    def __init__(self, priority=None):
+        super().__init__()
+        self.frontier = []
+        self.priority = priority if priority is not None else (lambda node: node.cost)
+        # Breaks ties in insertion order so nodes are never compared
+        self.counter = itertools.count()
+
+    def add(self, node):
+        heapq.heappush(self.frontier, (self.priority(node), next(self.counter), node))
+        self._track(node.state)
+
+    def remove(self):
+        if self.empty():
+            raise Exception("empty frontier")
+        else:
+            node = heapq.heappop(self.frontier)[2]
+            self._untrack(node.state)
             return node
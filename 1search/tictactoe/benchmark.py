@@ -0,0 +1,256 @@
+"""
+Benchmarks for the Tic Tac Toe engine.
+
+Usage:
+    python benchmark.py perft [--depth D] [--engine list|bitboard]
+                              [--size rows cols k] [common options]
+    python benchmark.py selfplay [--games G] [--random-moves R] [--seed S]
+                                 [--no-book] [--time-limit T]
+                                 [--size rows cols k] [common options]
+
+Common options: [--memory] [--json FILE] [--baseline FILE] [--tolerance T]
+
+perft counts the positions reached after each number of moves, through
+the list-board functions in tictactoe.py or the bitboard engine. selfplay
+plays AI-vs-AI games headlessly, with the first R moves of each game
+random so games differ, and reports moves per second and minimax latency
+percentiles. With --baseline, exits non-zero if a metric regressed.
+"""
+
+import argparse
+import json
+import random
+import sys
+import time
+import tracemalloc
+
+import bitboard
+import tictactoe as ttt
+
+
+def measure(function, memory=False):
+    """
+    Calls function and returns (result, seconds, peak bytes allocated or None).
+    """
+    if memory:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        result = function()
+    finally:
+        elapsed = time.perf_counter() - start
+        peak = None
+        if memory:
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def perft(board, depth):
+    """
+    Returns the number of positions reached from board after exactly
+    depth moves, using the list-board functions. Finished games have no
+    moves, so they only count at depth 0.
+    """
+    if depth == 0:
+        return 1
+    if ttt.terminal(board):
+        return 0
+    return sum(perft(ttt.result(board, action), depth - 1)
+               for action in ttt.actions(board))
+
+
+def perft_bitboard(state, depth):
+    """
+    perft on (x, o) states with the 3x3 bitboard engine.
+    """
+    if depth == 0:
+        return 1
+    if bitboard.terminal(state):
+        return 0
+    return sum(perft_bitboard(bitboard.result(state, bit), depth - 1)
+               for bit in bitboard.actions(state))
+
+
+def percentile(values, fraction):
+    """
+    Returns the value at fraction (0 to 1) of the sorted values.
+    """
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+
+def run_perft(depth, engine, memory=False):
+    """
+    Runs perft to each depth up to depth. Returns {metric: value}.
+    """
+    if engine == "bitboard" and not ttt.is_classic():
+        raise ValueError("the bitboard engine only plays 3x3 boards")
+    results = {}
+    total = 0
+    total_seconds = 0.0
+    peak = 0
+    for level in range(1, depth + 1):
+        if engine == "bitboard":
+            count, elapsed, used = measure(
+                lambda: perft_bitboard(bitboard.initial_state(), level), memory)
+        else:
+            count, elapsed, used = measure(lambda: perft(ttt.initial_state(), level), memory)
+        results[f"perft.{level}"] = count
+        results[f"perft.{level}_seconds"] = elapsed
+        total += count
+        total_seconds += elapsed
+        if used is not None:
+            peak = max(peak, used)
+    results["perft.positions_per_sec"] = total / total_seconds if total_seconds else 0.0
+    if memory:
+        results["perft.peak_bytes"] = peak
+    return results
+
+
+def play(generator, random_moves, latencies):
+    """
+    Plays one game from the empty board, random for the first
+    random_moves moves and minimax afterwards. Appends each minimax call's
+    seconds to latencies and returns the winner (None for a tie) and the
+    number of moves.
+    """
+    board = ttt.initial_state()
+    moves = 0
+    while not ttt.terminal(board):
+        if moves < random_moves:
+            action = generator.choice(sorted(ttt.actions(board)))
+        else:
+            start = time.perf_counter()
+            action = ttt.minimax(board)
+            latencies.append(time.perf_counter() - start)
+        board = ttt.result(board, action)
+        moves += 1
+    return ttt.winner(board), moves
+
+
+def run_selfplay(games, random_moves, seed=0, memory=False):
+    """
+    Plays games AI-vs-AI games. Returns {metric: value}.
+    """
+    generator = random.Random(seed)
+    latencies = []
+    outcomes = {ttt.X: 0, ttt.O: 0, None: 0}
+
+    def games_played():
+        moves = 0
+        for _ in range(games):
+            winner, count = play(generator, random_moves, latencies)
+            outcomes[winner] += 1
+            moves += count
+        return moves
+
+    moves, elapsed, peak = measure(games_played, memory)
+    results = {
+        "selfplay.games": games,
+        "selfplay.x_wins": outcomes[ttt.X],
+        "selfplay.o_wins": outcomes[ttt.O],
+        "selfplay.ties": outcomes[None],
+        "selfplay.seconds": elapsed,
+        "selfplay.moves_per_sec": moves / elapsed if elapsed else 0.0,
+    }
+    if latencies:
+        results["selfplay.minimax_per_sec"] = len(latencies) / sum(latencies) if sum(latencies) else 0.0
+        for name, fraction in (("p50", 0.5), ("p90", 0.9), ("p99", 0.99), ("max", 1.0)):
+            results[f"selfplay.latency_{name}_seconds"] = percentile(latencies, fraction)
+    if peak is not None:
+        results["selfplay.peak_bytes"] = peak
+    return results
+
+
+def regressions(results, baseline, tolerance):
+    """
+    Returns descriptions of metrics more than tolerance (a fraction) worse
+    than in baseline: lower throughput, or higher times or memory.
+    Positions counts must match exactly.
+    """
+    found = []
+    for metric, old in baseline.items():
+        new = results.get(metric)
+        if new is None:
+            continue
+        if metric.startswith("perft.") and metric[len("perft."):].isdigit():
+            worse = new != old
+        elif not old:
+            continue
+        elif metric.endswith("_per_sec"):
+            worse = new < old * (1 - tolerance)
+        elif metric.endswith("_seconds") or metric.endswith("_bytes"):
+            worse = new > old * (1 + tolerance)
+        else:
+            continue
+        if worse:
+            found.append(f"{metric}: {old:.4g} -> {new:.4g}")
+    return found
+
+
+def report(results, args):
+    for metric, value in results.items():
+        print(f"    {metric:<36} {value if isinstance(value, int) else f'{value:.4g}'}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        found = regressions(results, baseline, args.tolerance)
+        if found:
+            print("Regressions:")
+            for line in found:
+                print(f"    {line}")
+            sys.exit(1)
+        print("No regressions.")
+
+
+def main_perft(args):
+    print(f"perft on {ttt.ROWS}x{ttt.COLS}, {ttt.WIN_LENGTH} in a row ({args.engine})")
+    report(run_perft(args.depth, args.engine, args.memory), args)
+
+
+def main_selfplay(args):
+    ttt.use_book = not args.no_book
+    print(f"self-play on {ttt.ROWS}x{ttt.COLS}, {ttt.WIN_LENGTH} in a row")
+    report(run_selfplay(args.games, args.random_moves, args.seed, args.memory), args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    common = argparse.ArgumentParser(add_help=False)
+    common.add_argument("--size", type=int, nargs=3, default=[3, 3, 3], metavar=("ROWS", "COLS", "K"))
+    common.add_argument("--time-limit", type=float, default=1.0,
+                        help="seconds per move on boards other than 3x3")
+    common.add_argument("--memory", action="store_true", help="trace peak memory")
+    common.add_argument("--json", metavar="FILE", help="write results as JSON")
+    common.add_argument("--baseline", metavar="FILE", help="fail on regressions against JSON results")
+    common.add_argument("--tolerance", type=float, default=0.2)
+
+    perft_command = commands.add_parser("perft", parents=[common], help="count positions by depth")
+    perft_command.add_argument("--depth", type=int, default=9)
+    perft_command.add_argument("--engine", choices=("list", "bitboard"), default="list")
+    perft_command.set_defaults(handler=main_perft)
+
+    selfplay = commands.add_parser("selfplay", parents=[common], help="play AI-vs-AI games")
+    selfplay.add_argument("--games", type=int, default=1000)
+    selfplay.add_argument("--random-moves", type=int, default=2)
+    selfplay.add_argument("--seed", type=int, default=0)
+    selfplay.add_argument("--no-book", action="store_true", help="search instead of using book.py")
+    selfplay.set_defaults(handler=main_selfplay)
+
+    args = parser.parse_args()
+    if args.command == "perft" and args.engine == "bitboard" and args.size != [3, 3, 3]:
+        perft_command.error("the bitboard engine only plays 3x3 boards")
+    ttt.configure(*args.size, time_limit=args.time_limit)
+    args.handler(args)
+
+
+if __name__ == "__main__":
+    main()
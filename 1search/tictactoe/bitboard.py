@@ -0,0 +1,328 @@
+"""
+Bitboard Tic Tac Toe engine
+
+A state is a pair of 9-bit masks (x, o), one per player, where cell
+(i, j) is bit 3 * i + j.
+"""
+
+from collections import OrderedDict
+
+X = "X"
+O = "O"
+
+SIZE = 3
+CELLS = SIZE * SIZE
+FULL = (1 << CELLS) - 1
+
+
+def win_masks(rows, cols, k):
+    """
+    Returns the masks of every k cells in a row (horizontally,
+    vertically or diagonally) on a rows x cols board.
+    """
+    masks = []
+    for i in range(rows):
+        for j in range(cols):
+            for di, dj in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                end_i = i + di * (k - 1)
+                end_j = j + dj * (k - 1)
+                if 0 <= end_i < rows and 0 <= end_j < cols:
+                    mask = 0
+                    for step in range(k):
+                        mask |= 1 << ((i + di * step) * cols + j + dj * step)
+                    masks.append(mask)
+    return masks
+
+
+WIN_MASKS = win_masks(SIZE, SIZE, SIZE)
+
+# WINS[mask] is 1 if the cells in mask contain a winning line
+WINS = bytearray(1 << CELLS)
+for _mask in range(1 << CELLS):
+    WINS[_mask] = any(_mask & line == line for line in WIN_MASKS)
+
+# The 8 symmetries of the square as (i, j) -> (i', j') maps:
+# 4 rotations, each optionally followed by a reflection
+SYMMETRIES = [
+    lambda i, j: (i, j),
+    lambda i, j: (j, SIZE - 1 - i),
+    lambda i, j: (SIZE - 1 - i, SIZE - 1 - j),
+    lambda i, j: (SIZE - 1 - j, i),
+    lambda i, j: (i, SIZE - 1 - j),
+    lambda i, j: (j, i),
+    lambda i, j: (SIZE - 1 - i, j),
+    lambda i, j: (SIZE - 1 - j, SIZE - 1 - i),
+]
+
+# TRANSFORMS[s][mask] is mask with symmetry s applied to every cell
+TRANSFORMS = []
+for _symmetry in SYMMETRIES:
+    _cells = [_symmetry(cell // SIZE, cell % SIZE) for cell in range(CELLS)]
+    _table = [0] * (1 << CELLS)
+    for _mask in range(1 << CELLS):
+        for cell, (i, j) in enumerate(_cells):
+            if _mask >> cell & 1:
+                _table[_mask] |= 1 << (SIZE * i + j)
+    TRANSFORMS.append(_table)
+
+# Whether the search treats symmetric positions as one
+use_symmetry = True
+
+# Transposition table: state key -> minimax value of that state
+transpositions = OrderedDict()
+# Maximum number of entries kept (least recently used evicted), None for unbounded
+cache_size = None
+# nodes: positions visited, pruned: moves skipped as symmetric duplicates,
+# cutoffs: searches stopped early by a won position
+cache_stats = {"hits": 0, "misses": 0, "nodes": 0, "pruned": 0, "cutoffs": 0}
+
+
+def initial_state():
+    return (0, 0)
+
+
+def from_board(board):
+    """
+    Returns the (x, o) masks of a list-of-lists board.
+    """
+    x = o = 0
+    bit = 1
+    for line in board:
+        for item in line:
+            if item == X:
+                x |= bit
+            elif item == O:
+                o |= bit
+            bit <<= 1
+    return (x, o)
+
+
+def to_board(state):
+    """
+    Returns the list-of-lists board of (x, o) masks.
+    """
+    x, o = state
+    return [[X if x >> (SIZE * i + j) & 1 else O if o >> (SIZE * i + j) & 1 else None
+             for j in range(SIZE)]
+            for i in range(SIZE)]
+
+
+def bit_to_action(bit):
+    cell = bit.bit_length() - 1
+    return (cell // SIZE, cell % SIZE)
+
+
+def action_to_bit(action):
+    return 1 << (SIZE * action[0] + action[1])
+
+
+def player(state):
+    """
+    Returns player who has the next turn, from the move counts.
+    """
+    x, o = state
+    return X if x.bit_count() == o.bit_count() else O
+
+
+def actions(state):
+    """
+    Returns the list of empty cell bits, lowest cell first.
+    """
+    x, o = state
+    empty = ~(x | o) & FULL
+    moves = []
+    while empty:
+        bit = empty & -empty
+        moves.append(bit)
+        empty ^= bit
+    return moves
+
+
+def result(state, bit):
+    """
+    Returns the state after the player to move takes the cell bit.
+    """
+    x, o = state
+    if (x | o) & bit or not bit & FULL:
+        raise RuntimeError("action is wrong")
+    if x.bit_count() == o.bit_count():
+        return (x | bit, o)
+    return (x, o | bit)
+
+
+def winner(state):
+    x, o = state
+    if WINS[x]:
+        return X
+    if WINS[o]:
+        return O
+    return None
+
+
+def terminal(state):
+    x, o = state
+    return WINS[x] or WINS[o] or (x | o) == FULL
+
+
+def utility(state):
+    x, o = state
+    if WINS[x]:
+        return 1
+    if WINS[o]:
+        return -1
+    return 0
+
+
+def canonical(x, o):
+    """
+    Returns the smallest key x | o << 9 over the 8 symmetric images of
+    the position, so that equivalent positions share one key.
+    """
+    return min(table[x] | table[o] << CELLS for table in TRANSFORMS)
+
+
+def state_key(x, o):
+    if use_symmetry:
+        return canonical(x, o)
+    return x | o << CELLS
+
+
+def value(state):
+    """
+    Returns the minimax value of state: 1 if X wins with perfect play,
+    -1 if O wins, 0 for a draw.
+    """
+    return _value(*state)
+
+
+def _value(x, o):
+    cache_stats["nodes"] += 1
+    key = state_key(x, o)
+    if key in transpositions:
+        cache_stats["hits"] += 1
+        if cache_size is not None:
+            transpositions.move_to_end(key)
+        return transpositions[key]
+    cache_stats["misses"] += 1
+
+    if WINS[x]:
+        val = 1
+    elif WINS[o]:
+        val = -1
+    elif (x | o) == FULL:
+        val = 0
+    else:
+        if x.bit_count() == o.bit_count():
+            val = -2
+            for bit in distinct_moves(x, o):
+                val = max(val, _value(x | bit, o))
+                if val == 1:  # pruning
+                    cache_stats["cutoffs"] += 1
+                    break
+        else:
+            val = 2
+            for bit in distinct_moves(x, o):
+                val = min(val, _value(x, o | bit))
+                if val == -1:  # pruning
+                    cache_stats["cutoffs"] += 1
+                    break
+
+    transpositions[key] = val
+    if cache_size is not None and len(transpositions) > cache_size:
+        transpositions.popitem(last=False)
+    return val
+
+
+def distinct_moves(x, o):
+    """
+    Returns the empty cell bits, lowest cell first. With use_symmetry,
+    moves leading to a position symmetric to an earlier move's are left out.
+    """
+    moves = actions((x, o))
+    if not use_symmetry:
+        return moves
+    x_to_move = x.bit_count() == o.bit_count()
+    seen = set()
+    distinct = []
+    for bit in moves:
+        key = canonical(x | bit, o) if x_to_move else canonical(x, o | bit)
+        if key in seen:
+            cache_stats["pruned"] += 1
+            continue
+        seen.add(key)
+        distinct.append(bit)
+    return distinct
+
+
+def best_move(state):
+    """
+    Returns the cell bit of an optimal move for the player to move
+    (the lowest such cell), or None if the game is over.
+    """
+    if terminal(state):
+        return None
+    maximizing = player(state) == X
+    best = None
+    best_value = None
+    for bit in distinct_moves(*state):
+        val = value(result(state, bit))
+        if best_value is None or (val > best_value if maximizing else val < best_value):
+            best = bit
+            best_value = val
+            if best_value == (1 if maximizing else -1):  # pruning
+                cache_stats["cutoffs"] += 1
+                break
+    return best
+
+
+def set_cache_size(size):
+    """
+    Bounds the transposition table to size entries (None for unbounded),
+    evicting the least recently used entries.
+    """
+    global cache_size
+    cache_size = size
+    if size is not None:
+        while len(transpositions) > size:
+            transpositions.popitem(last=False)
+
+
+def clear_cache():
+    """
+    Empties the transposition table and resets its hit/miss statistics.
+    """
+    transpositions.clear()
+    for counter in cache_stats:
+        cache_stats[counter] = 0
+
+
+def cache_info():
+    """
+    Returns the transposition table hits, misses and current size, and
+    the nodes visited, symmetric moves pruned and cutoffs.
+    """
+    info = dict(cache_stats)
+    info["size"] = len(transpositions)
+    info["max_size"] = cache_size
+    return info
+
+
+def symmetry_savings(state=(0, 0)):
+    """
+    Solves state from an empty transposition table with and without
+    symmetry reduction and returns the cache_info of each, keyed by
+    "plain" and "symmetric". Leaves the table empty afterwards.
+    """
+    global use_symmetry
+    previous = use_symmetry
+    report = {}
+    try:
+        for name, enabled in (("plain", False), ("symmetric", True)):
+            use_symmetry = enabled
+            clear_cache()
+            best_move(state)
+            report[name] = cache_info()
+    finally:
+        use_symmetry = previous
+        clear_cache()
+    return report
@@ -0,0 +1,111 @@
+"""
+Perfect-play solution table for 3x3 Tic Tac Toe
+
+Every non-terminal position reachable from the empty board is solved
+once with bitboard.py and stored as key x | o << 9 -> best move and
+value. The file holds the sorted keys (4 bytes each) followed by one
+byte per key: the best move's cell in the low 4 bits and value + 1 in
+the high 4 bits.
+
+Usage: python book.py [path]
+"""
+
+import os
+import sys
+from array import array
+
+import bitboard
+
+BOOK_MAGIC = b"TTTBOOK\0"
+BOOK_VERSION = 1
+BOOK_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "tictactoe.book")
+
+
+def solve():
+    """
+    Returns a dict of key -> (best move bit, value) for every
+    non-terminal position reachable from the empty board.
+    """
+    table = {}
+    stack = [bitboard.initial_state()]
+    seen = set()
+    while stack:
+        state = stack.pop()
+        x, o = state
+        key = x | o << bitboard.CELLS
+        if key in seen or bitboard.terminal(state):
+            continue
+        seen.add(key)
+        table[key] = (bitboard.best_move(state), bitboard.value(state))
+        for bit in bitboard.actions(state):
+            stack.append(bitboard.result(state, bit))
+    return table
+
+
+def save(table, path=BOOK_PATH):
+    keys = array("I", sorted(table))
+    entries = bytearray(len(keys))
+    for i, key in enumerate(keys):
+        bit, value = table[key]
+        entries[i] = (bit.bit_length() - 1) | (value + 1) << 4
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(BOOK_MAGIC)
+        f.write(BOOK_VERSION.to_bytes(4, "little"))
+        f.write(len(keys).to_bytes(4, "little"))
+        f.write(keys.tobytes())
+        f.write(entries)
+    os.replace(temporary, path)
+
+
+def read(path=BOOK_PATH):
+    """
+    Returns the table written by save, or None if the file is missing,
+    from another version, or truncated.
+    """
+    try:
+        with open(path, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    header = len(BOOK_MAGIC) + 8
+    if len(data) < header or data[:len(BOOK_MAGIC)] != BOOK_MAGIC:
+        return None
+    version = int.from_bytes(data[len(BOOK_MAGIC):len(BOOK_MAGIC) + 4], "little")
+    count = int.from_bytes(data[len(BOOK_MAGIC) + 4:header], "little")
+    if version != BOOK_VERSION or len(data) != header + 5 * count:
+        return None
+    keys = array("I")
+    keys.frombytes(data[header:header + 4 * count])
+    entries = data[header + 4 * count:]
+    return {key: (1 << (entry & 15), (entry >> 4) - 1)
+            for key, entry in zip(keys, entries)}
+
+
+def load(path=BOOK_PATH, cache=True):
+    """
+    Returns the table stored at path. If it is missing or stale, solves
+    the game instead and, with cache, writes the table for next time.
+    """
+    table = read(path)
+    if table is None:
+        table = solve()
+        if cache:
+            try:
+                save(table, path)
+            except OSError:
+                pass
+    return table
+
+
+def main():
+    if len(sys.argv) > 2:
+        sys.exit("Usage: python book.py [path]")
+    path = sys.argv[1] if len(sys.argv) == 2 else BOOK_PATH
+    table = solve()
+    save(table, path)
+    print(f"{len(table)} positions written to {path} ({os.path.getsize(path)} bytes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,365 @@
+"""
+m,n,k-game engine: k in a row on a rows x cols board
+
+States are (x, o) bitboards as in bitboard.py, with cell (i, j) at bit
+cols * i + j. Search is depth-limited alpha-beta with move ordering and
+a transposition table, run by iterative deepening under a time budget.
+"""
+
+import threading
+import time
+
+from bitboard import win_masks
+
+X = "X"
+O = "O"
+
+# Score of a won position; wins found sooner score higher
+WIN = 10 ** 9
+
+# Transposition table entry flags
+EXACT, LOWER, UPPER = 0, 1, 2
+
+# Boards with more cells than this only consider moves next to a stone
+NEIGHBORHOOD_CELLS = 25
+
+
+class Game():
+    def __init__(self, rows=3, cols=3, k=3):
+        if not (1 <= k <= max(rows, cols)):
+            raise ValueError("win length must fit on the board")
+        self.rows = rows
+        self.cols = cols
+        self.k = k
+        self.cells = rows * cols
+        self.full = (1 << self.cells) - 1
+        self.masks = win_masks(rows, cols, k)
+        self.masks_by_cell = [[mask for mask in self.masks if mask >> cell & 1]
+                              for cell in range(self.cells)]
+
+        # Small boards look wins up in a table instead of scanning lines
+        self.wins = None
+        if self.cells <= 12:
+            self.wins = bytearray(1 << self.cells)
+            for mask in range(1 << self.cells):
+                self.wins[mask] = any(mask & line == line for line in self.masks)
+
+        # Cells from the center outwards, and each cell's adjacent cells
+        center_i, center_j = (rows - 1) / 2, (cols - 1) / 2
+        self.center_order = sorted(
+            range(self.cells),
+            key=lambda cell: abs(cell // cols - center_i) + abs(cell % cols - center_j))
+        self.adjacent = []
+        for cell in range(self.cells):
+            i, j = divmod(cell, cols)
+            mask = 0
+            for di in (-1, 0, 1):
+                for dj in (-1, 0, 1):
+                    if (di or dj) and 0 <= i + di < rows and 0 <= j + dj < cols:
+                        mask |= 1 << ((i + di) * cols + j + dj)
+            self.adjacent.append(mask)
+
+    def __repr__(self):
+        return f"Game({self.rows}, {self.cols}, {self.k})"
+
+    def initial_state(self):
+        return (0, 0)
+
+    def from_board(self, board):
+        """
+        Returns the (x, o) masks of a list-of-lists board.
+        """
+        x = o = 0
+        bit = 1
+        for line in board:
+            for item in line:
+                if item == X:
+                    x |= bit
+                elif item == O:
+                    o |= bit
+                bit <<= 1
+        return (x, o)
+
+    def to_board(self, state):
+        x, o = state
+        return [[X if x >> (self.cols * i + j) & 1 else O if o >> (self.cols * i + j) & 1 else None
+                 for j in range(self.cols)]
+                for i in range(self.rows)]
+
+    def bit_to_action(self, bit):
+        return divmod(bit.bit_length() - 1, self.cols)
+
+    def action_to_bit(self, action):
+        return 1 << (self.cols * action[0] + action[1])
+
+    def is_win(self, mask):
+        if self.wins is not None:
+            return self.wins[mask]
+        for line in self.masks:
+            if mask & line == line:
+                return True
+        return False
+
+    def player(self, state):
+        x, o = state
+        return X if x.bit_count() == o.bit_count() else O
+
+    def actions(self, state):
+        """
+        Returns the list of empty cell bits, lowest cell first.
+        """
+        x, o = state
+        empty = ~(x | o) & self.full
+        moves = []
+        while empty:
+            bit = empty & -empty
+            moves.append(bit)
+            empty ^= bit
+        return moves
+
+    def result(self, state, bit):
+        x, o = state
+        if (x | o) & bit or not bit & self.full:
+            raise RuntimeError("action is wrong")
+        if x.bit_count() == o.bit_count():
+            return (x | bit, o)
+        return (x, o | bit)
+
+    def winner(self, state):
+        x, o = state
+        if self.is_win(x):
+            return X
+        if self.is_win(o):
+            return O
+        return None
+
+    def terminal(self, state):
+        x, o = state
+        return bool(self.is_win(x) or self.is_win(o) or (x | o) == self.full)
+
+    def utility(self, state):
+        x, o = state
+        if self.is_win(x):
+            return 1
+        if self.is_win(o):
+            return -1
+        return 0
+
+
+def default_evaluate(game, x, o):
+    """
+    Heuristic score from X's point of view: every line still open to one
+    player scores 10 ** (stones in it) for that player.
+    """
+    score = 0
+    for line in game.masks:
+        mine = x & line
+        theirs = o & line
+        if mine and not theirs:
+            score += 10 ** mine.bit_count()
+        elif theirs and not mine:
+            score -= 10 ** theirs.bit_count()
+    return score
+
+
+class Timeout(Exception):
+    pass
+
+
+class Search():
+    """
+    Alpha-beta search over a Game with a pluggable evaluate(game, x, o)
+    function. The transposition table is kept across searches.
+    """
+
+    def __init__(self, game, evaluate=None, time_limit=None):
+        self.game = game
+        self.evaluate = evaluate if evaluate is not None else default_evaluate
+        self.time_limit = time_limit
+        self.table = {}
+        self.deadline = None
+        self.stopped = threading.Event()
+        self.nodes = 0
+        self.cutoffs = 0
+        self.hits = 0
+        self.misses = 0
+        self.depth = 0
+
+    def best_move(self, state, max_depth=None):
+        """
+        Returns the best cell bit for the player to move found by iterative
+        deepening, stopping at max_depth, when the game is solved, or when
+        time_limit seconds have passed or stop was called (keeping the last
+        completed depth). Returns None if the game is over.
+        """
+        game = self.game
+        self.nodes = 0
+        self.cutoffs = 0
+        self.hits = 0
+        self.misses = 0
+        self.depth = 0
+        if game.terminal(state):
+            return None
+        x, o = state
+        remaining = game.cells - (x | o).bit_count()
+        max_depth = remaining if max_depth is None else min(max_depth, remaining)
+        self.deadline = (None if self.time_limit is None
+                         else time.perf_counter() + self.time_limit)
+
+        best = self.ordered_moves(x, o, None)[0]
+        for depth in range(1, max_depth + 1):
+            if self.stopped.is_set():
+                break
+            try:
+                value, move = self.root(x, o, depth, best)
+            except Timeout:
+                break
+            best = move
+            self.depth = depth
+            if abs(value) > WIN - game.cells:
+                break  # forced win or loss found
+        return best
+
+    def stop(self):
+        """
+        Makes a running best_move return its last completed depth's move
+        soon, and any later one return right away until clear_stop is
+        called; safe to call from another thread.
+        """
+        self.stopped.set()
+
+    def clear_stop(self):
+        """
+        Lets best_move search again after stop; call it before handing a
+        new search to another thread, not from within that thread, so a
+        stop made once the search is running is never lost.
+        """
+        self.stopped.clear()
+
+    def root(self, x, o, depth, first):
+        maximizing = x.bit_count() == o.bit_count()
+        alpha, beta = -WIN - 1, WIN + 1
+        best = None
+        best_value = None
+        for bit in self.ordered_moves(x, o, first):
+            if maximizing:
+                value = self.alphabeta(x | bit, o, depth - 1, alpha, beta, 1)
+            else:
+                value = self.alphabeta(x, o | bit, depth - 1, alpha, beta, 1)
+            if best_value is None or (value > best_value if maximizing else value < best_value):
+                best = bit
+                best_value = value
+                if maximizing:
+                    alpha = max(alpha, value)
+                else:
+                    beta = min(beta, value)
+        return best_value, best
+
+    def alphabeta(self, x, o, depth, alpha, beta, ply):
+        """
+        Returns the minimax value of (x, o) searched depth plies deep,
+        from X's point of view, within the (alpha, beta) window.
+        """
+        game = self.game
+        self.nodes += 1
+        if not self.nodes & 127:
+            if self.stopped.is_set() or (
+                    self.deadline is not None and time.perf_counter() > self.deadline):
+                raise Timeout()
+
+        if game.is_win(x):
+            return WIN - ply
+        if game.is_win(o):
+            return ply - WIN
+        if (x | o) == game.full:
+            return 0
+        if depth == 0:
+            return self.evaluate(game, x, o)
+
+        key = x | o << game.cells
+        entry = self.table.get(key)
+        first = None
+        if entry is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            entry_depth, value, flag, first = entry
+            if entry_depth >= depth:
+                if flag == EXACT:
+                    return value
+                if flag == LOWER:
+                    alpha = max(alpha, value)
+                elif flag == UPPER:
+                    beta = min(beta, value)
+                if alpha >= beta:
+                    return value
+
+        original_alpha, original_beta = alpha, beta
+        maximizing = x.bit_count() == o.bit_count()
+        best = None
+        best_value = -WIN - 1 if maximizing else WIN + 1
+        for bit in self.ordered_moves(x, o, first):
+            if maximizing:
+                value = self.alphabeta(x | bit, o, depth - 1, alpha, beta, ply + 1)
+                if value > best_value:
+                    best_value, best = value, bit
+                alpha = max(alpha, value)
+            else:
+                value = self.alphabeta(x, o | bit, depth - 1, alpha, beta, ply + 1)
+                if value < best_value:
+                    best_value, best = value, bit
+                beta = min(beta, value)
+            if alpha >= beta:  # pruning
+                self.cutoffs += 1
+                break
+
+        if best_value <= original_alpha:
+            flag = UPPER
+        elif best_value >= original_beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self.table[key] = (depth, best_value, flag, best)
+        return best_value
+
+    def ordered_moves(self, x, o, first):
+        """
+        Returns candidate moves, most promising first: the transposition
+        table move, then cells on the most lines already holding stones,
+        then cells nearest the center. Large boards only consider cells
+        next to an existing stone.
+        """
+        game = self.game
+        occupied = x | o
+        empty = ~occupied & game.full
+        if game.cells > NEIGHBORHOOD_CELLS and occupied:
+            near = 0
+            stones = occupied
+            while stones:
+                bit = stones & -stones
+                near |= game.adjacent[bit.bit_length() - 1]
+                stones ^= bit
+            empty &= near
+
+        scored = []
+        for rank, cell in enumerate(game.center_order):
+            bit = 1 << cell
+            if not empty & bit:
+                continue
+            # Lines through the cell that one side could still complete,
+            # weighted by how many stones they already hold
+            score = 0
+            for line in game.masks_by_cell[cell]:
+                mine = x & line
+                theirs = o & line
+                if not theirs:
+                    score += mine.bit_count() ** 2
+                if not mine:
+                    score += theirs.bit_count() ** 2
+            scored.append((-score, rank, bit))
+        scored.sort()
+        moves = [bit for _, _, bit in scored]
+        if first is not None and first in moves:
+            moves.remove(first)
+            moves.insert(0, first)
+        return moves
@@ -0,0 +1,171 @@
+"""
+Root-split alpha-beta search for m,n,k boards across CPU cores.
+
+Usage: python parallel.py [--processes N] [--depth D] [--stones S]
+                          [--seed R] rows cols k
+
+Searches a position with S random stones to depth D sequentially and in
+parallel, checks both pick the same move, and reports the speedup.
+"""
+
+import argparse
+import multiprocessing
+import os
+import random
+import time
+
+import mnk
+
+# Search, shared (bound, position) array and current call id of each
+# worker process, set up in init_worker
+worker_search = None
+worker_shared = None
+worker_generation = None
+
+
+def init_worker(rows, cols, k, evaluate, shared):
+    global worker_search, worker_shared
+    worker_search = mnk.Search(mnk.Game(rows, cols, k), evaluate)
+    worker_shared = shared
+
+
+def solve(task):
+    """
+    Searches one root move within the best bound found so far by any
+    worker. Returns (value, exact, nodes), where value is only a bound
+    (no better than the shared one) unless exact.
+
+    Moves ordered before the one that set the bound search one point
+    wider, so a move tying it is still found exactly and the earliest of
+    equal moves wins, as in the sequential search.
+    """
+    global worker_generation
+    generation, x, o, depth, position, bit = task
+    search = worker_search
+    if generation != worker_generation:
+        search.table.clear()
+        worker_generation = generation
+    search.nodes = 0
+
+    with worker_shared.get_lock():
+        bound, index = worker_shared[0], worker_shared[1]
+    widen = 1 if position < index else 0
+    if x.bit_count() == o.bit_count():
+        alpha = bound - widen
+        value = search.alphabeta(x | bit, o, depth - 1, alpha, mnk.WIN + 1, 1)
+        exact = value > alpha
+        better = value > bound
+    else:
+        beta = bound + widen
+        value = search.alphabeta(x, o | bit, depth - 1, -mnk.WIN - 1, beta, 1)
+        exact = value < beta
+        better = value < bound
+
+    if exact:
+        with worker_shared.get_lock():
+            bound, index = worker_shared[0], worker_shared[1]
+            if better or (value == bound and position < index):
+                worker_shared[0] = value
+                worker_shared[1] = position
+    return value, exact, search.nodes
+
+
+def best_move(game, state, max_depth=None, processes=None, evaluate=None):
+    """
+    Returns (move bit, nodes) for the player to move, searching the root
+    moves of each iterative-deepening depth in parallel. The move is the
+    one a fresh mnk.Search(game, evaluate).best_move(state, max_depth)
+    picks. Returns (None, 0) if the game is over.
+    """
+    if game.terminal(state):
+        return None, 0
+    x, o = state
+    remaining = game.cells - (x | o).bit_count()
+    max_depth = remaining if max_depth is None else min(max_depth, remaining)
+    maximizing = x.bit_count() == o.bit_count()
+    evaluate = evaluate if evaluate is not None else mnk.default_evaluate
+    orderer = mnk.Search(game, evaluate)
+
+    shared = multiprocessing.Array("q", 2)
+    workers = processes or os.cpu_count() or 1
+    generation = (os.getpid(), time.perf_counter_ns())
+    best = orderer.ordered_moves(x, o, None)[0]
+    nodes = 0
+    initargs = (game.rows, game.cols, game.k, evaluate, shared)
+    with multiprocessing.Pool(workers, initializer=init_worker, initargs=initargs) as pool:
+        for depth in range(1, max_depth + 1):
+            moves = orderer.ordered_moves(x, o, best)
+            shared[0] = -mnk.WIN - 1 if maximizing else mnk.WIN + 1
+            shared[1] = len(moves)
+            tasks = [(generation, x, o, depth, position, bit)
+                     for position, bit in enumerate(moves)]
+            results = pool.map(solve, tasks, chunksize=1)
+
+            best_value = None
+            for bit, (value, exact, count) in zip(moves, results):
+                nodes += count
+                if exact and (best_value is None
+                              or (value > best_value if maximizing else value < best_value)):
+                    best, best_value = bit, value
+            if abs(best_value) > mnk.WIN - game.cells:
+                break  # forced win or loss found
+    return best, nodes
+
+
+def random_position(game, stones, seed=0):
+    """
+    Returns a non-terminal state with stones random stones placed near
+    the center, or None if none was found.
+    """
+    generator = random.Random(seed)
+    for _ in range(100):
+        state = game.initial_state()
+        cells = game.center_order[:max(stones * 2, 1)]
+        for cell in generator.sample(cells, min(stones, len(cells))):
+            state = game.result(state, 1 << cell)
+        if not game.terminal(state):
+            return state
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("rows", type=int)
+    parser.add_argument("cols", type=int)
+    parser.add_argument("k", type=int)
+    parser.add_argument("--depth", type=int, default=4)
+    parser.add_argument("--processes", type=int, default=None)
+    parser.add_argument("--stones", type=int, default=2)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    game = mnk.Game(args.rows, args.cols, args.k)
+    state = random_position(game, args.stones, args.seed)
+    if state is None:
+        parser.error("could not place that many stones without ending the game")
+    for line in game.to_board(state):
+        print(" ".join(item or "." for item in line))
+
+    search = mnk.Search(game)
+    start = time.perf_counter()
+    sequential = search.best_move(state, args.depth)
+    sequential_time = time.perf_counter() - start
+
+    workers = args.processes or os.cpu_count() or 1
+    start = time.perf_counter()
+    parallel, nodes = best_move(game, state, args.depth, workers)
+    parallel_time = time.perf_counter() - start
+
+    print(f"sequential: {game.bit_to_action(sequential)} in {sequential_time:.3f}s "
+          f"({search.nodes} nodes at depth {search.depth})")
+    print(f"parallel:   {game.bit_to_action(parallel)} in {parallel_time:.3f}s "
+          f"({nodes} nodes, {workers} processes)")
+    speedup = sequential_time / parallel_time if parallel_time > 0 else 0.0
+    print(f"speedup {speedup:.2f}x on {workers} processes, "
+          f"{os.cpu_count()} cores ({speedup / workers:.0%} efficiency)")
+    if parallel != sequential:
+        raise SystemExit("parallel search picked a different move")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,28 @@
+import argparse
 import pygame
 import sys
 import time
+from concurrent.futures import ThreadPoolExecutor
 
 import tictactoe as ttt
 
+# Least time the computer's move is shown as thinking, in seconds
+AI_DELAY = 0.5
+
+# Optional board size and win length, and search instrumentation
+parser = argparse.ArgumentParser(description="Play Tic-Tac-Toe against the computer.")
+parser.add_argument("size", type=int, nargs="*", metavar="rows cols k")
+parser.add_argument("--profile", action="store_true",
+                    help="print the search statistics of each computer move")
+parser.add_argument("--json", metavar="FILE",
+                    help="write the search statistics to FILE as JSON on exit")
+args = parser.parse_args()
+if len(args.size) not in (0, 3):
+    parser.error("give rows, cols and k together")
+if args.size:
+    ttt.configure(*args.size)
+ttt.enable_profiling(args.profile or args.json is not None)
+
 pygame.init()
 size = width, height = 600, 400
 
@@ -15,16 +34,44 @@ screen = pygame.display.set_mode(size)
 
 mediumFont = pygame.font.Font("OpenSans-Regular.ttf", 28)
 largeFont = pygame.font.Font("OpenSans-Regular.ttf", 40)
-moveFont = pygame.font.Font("OpenSans-Regular.ttf", 60)
+
+# Tiles shrink so larger boards still fit between the title and the button
+tile_size = min(80, (height - 160) // max(ttt.ROWS, ttt.COLS))
+moveFont = pygame.font.Font("OpenSans-Regular.ttf", tile_size * 3 // 4)
 
 user = None
 board = ttt.initial_state()
-ai_turn = False
+
+# The computer's move is computed off the event loop so the window keeps
+# drawing and handling input; ai_board is the board it was asked about
+executor = ThreadPoolExecutor(max_workers=1)
+ai_future = None
+ai_board = None
+ai_started = None
+clock = pygame.time.Clock()
+
+
+def cancel_ai():
+    """
+    Abandons the computer's pending move, if any.
+    """
+    global ai_future
+    if ai_future is not None:
+        if not ai_future.cancel():
+            ttt.stop_search()
+        ai_future = None
+
 
 while True:
 
     for event in pygame.event.get():
         if event.type == pygame.QUIT:
+            cancel_ai()
+            executor.shutdown(wait=False, cancel_futures=True)
+            if args.profile:
+                print(ttt.profile_report())
+            if args.json:
+                ttt.export_profile(args.json)
             sys.exit()
 
     screen.fill(black)
@@ -67,13 +114,12 @@ while True:
     else:
 
         # Draw game board
-        tile_size = 80
-        tile_origin = (width / 2 - (1.5 * tile_size),
-                       height / 2 - (1.5 * tile_size))
+        tile_origin = (width / 2 - (ttt.COLS / 2 * tile_size),
+                       height / 2 - (ttt.ROWS / 2 * tile_size))
         tiles = []
-        for i in range(3):
+        for i in range(ttt.ROWS):
             row = []
-            for j in range(3):
+            for j in range(ttt.COLS):
                 rect = pygame.Rect(
                     tile_origin[0] + j * tile_size,
                     tile_origin[1] + i * tile_size,
@@ -102,7 +148,7 @@ while True:
         elif user == player:
             title = f"Play as {user}"
         else:
-            title = f"Computer thinking..."
+            title = "Computer thinking" + "." * int(time.time() * 3 % 4)
         title = largeFont.render(title, True, white)
         titleRect = title.get_rect()
         titleRect.center = ((width / 2), 30)
@@ -110,20 +156,25 @@ while True:
 
         # Check for AI move
         if user != player and not game_over:
-            if ai_turn:
-                time.sleep(0.5)
-                move = ttt.minimax(board)
-                board = ttt.result(board, move)
-                ai_turn = False
-            else:
-                ai_turn = True
+            if ai_future is None:
+                ai_board = board
+                ttt.clear_stop()
+                ai_future = executor.submit(ttt.minimax, board)
+                ai_started = time.time()
+            elif ai_future.done() and time.time() - ai_started >= AI_DELAY:
+                move = ai_future.result()
+                ai_future = None
+                if ai_board is board:
+                    board = ttt.result(board, move)
+                    if args.profile and ttt.profile_records:
+                        print(ttt.format_record(ttt.profile_records[-1]))
 
         # Check for a user move
         click, _, _ = pygame.mouse.get_pressed()
         if click == 1 and user == player and not game_over:
             mouse = pygame.mouse.get_pos()
-            for i in range(3):
-                for j in range(3):
+            for i in range(ttt.ROWS):
+                for j in range(ttt.COLS):
                     if (board[i][j] == ttt.EMPTY and tiles[i][j].collidepoint(mouse)):
                         board = ttt.result(board, (i, j))
 
@@ -139,8 +190,9 @@ while True:
                 mouse = pygame.mouse.get_pos()
                 if againButton.collidepoint(mouse):
                     time.sleep(0.2)
+                    cancel_ai()
                     user = None
                     board = ttt.initial_state()
-                    ai_turn = False
 
     pygame.display.flip()
+    clock.tick(60)
@@ -1,139 +1,309 @@
 """
 Tic Tac Toe Player
+
+The list-of-lists board functions below are a compatibility layer over
+the bitboard engines: bitboard.py solves the classic 3x3 game exactly,
+and mnk.py plays larger boards configured with configure().
 """
 
-import math, copy
+import json
+import math
+import time
+
+import bitboard
+import book
+import mnk
 
 X = "X"
 O = "O"
 EMPTY = None
 
+# Board geometry and win length, set with configure()
+ROWS = 3
+COLS = 3
+WIN_LENGTH = 3
+# Seconds the AI may think on boards too large to solve outright
+TIME_LIMIT = 1.0
+
+game = mnk.Game(ROWS, COLS, WIN_LENGTH)
+search = mnk.Search(game, time_limit=TIME_LIMIT)
+
+# Whether 3x3 moves come from the precomputed solution table (book.py),
+# loaded on first use
+use_book = True
+solution_table = None
+
+# Opt-in search instrumentation: with profiling on, every minimax and
+# mostValue call appends a record of its work to profile_records
+profiling = False
+profile_records = []
+
+
+def configure(rows=3, cols=3, k=3, time_limit=1.0, evaluate=None):
+    """
+    Sets the board size, the number in a row needed to win, and, for
+    boards other than 3x3 with 3 in a row, the AI's time budget per move
+    and evaluation function evaluate(game, x, o).
+    """
+    global ROWS, COLS, WIN_LENGTH, TIME_LIMIT, game, search
+    game = mnk.Game(rows, cols, k)
+    search = mnk.Search(game, evaluate, time_limit)
+    ROWS, COLS, WIN_LENGTH, TIME_LIMIT = rows, cols, k, time_limit
+
+
+def is_classic():
+    return (ROWS, COLS, WIN_LENGTH) == (3, 3, 3)
+
 
 def initial_state():
     """
     Returns starting state of the board.
     """
-    return [[EMPTY, EMPTY, EMPTY],
-            [EMPTY, EMPTY, EMPTY],
-            [EMPTY, EMPTY, EMPTY]]
+    return [[EMPTY] * COLS for _ in range(ROWS)]
 
 
 def count_empty(board):
-    empty_count = 0
-    for line in board:
-        for item in line:
-            if item is EMPTY:
-                empty_count += 1
-    return empty_count
+    x, o = game.from_board(board)
+    return game.cells - (x | o).bit_count()
 
 
 def player(board):
     """
     Returns player who has the next turn on a board.
     """
-    return X if count_empty(board) % 2 == 1 else O
+    return game.player(game.from_board(board))
 
 
 def actions(board):
     """
     Returns set of all possible actions (i, j) available on the board.
     """
-    action = set()
-    for i in range(3):
-        for j in range(3):
-            if board[i][j] is EMPTY:
-                action.add((i,j))
-    return action
+    return {game.bit_to_action(bit) for bit in game.actions(game.from_board(board))}
 
 
 def result(board, action):
     """
     Returns the board that results from making move (i, j) on the board.
     """
-    if action not in actions(board):
+    i, j = action
+    if not (0 <= i < ROWS and 0 <= j < COLS) or board[i][j] is not EMPTY:
         print(action)
         print(actions(board))
         raise RuntimeError("action is wrong")
-    
-    result_board = copy.deepcopy(board)
-    result_board[action[0]][action[1]] = player(board)
-    return result_board
 
-def check_line(cell0,cell1,cell2):
-    if cell0 == cell1 == cell2 and cell0 in ["X","O"]:
-        return cell0
-    else:
-        return None
+    result_board = [line[:] for line in board]
+    result_board[i][j] = player(board)
+    return result_board
 
 def winner(board):
     """
     Returns the winner of the game, if there is one.
     """
-    #  horizontally,
-    for i in range(3):
-        if check_line(board[i][0], board[i][1], board[i][2]) is not None:
-            return check_line(board[i][0], board[i][1], board[i][2])
-    #  vertically,
-    for i in range(3):
-        if check_line(board[0][i], board[1][i], board[2][i]) is not None:
-            return check_line(board[0][i], board[1][i], board[2][i])
-    #  diagonally.
-    return check_line(board[0][0], board[1][1], board[2][2]) or check_line(board[2][0], board[1][1], board[0][2])
+    return game.winner(game.from_board(board))
 
 def terminal(board):
     """
     Returns True if game is over, False otherwise.
     """
-    return count_empty(board) == 0 or winner(board) is not None 
+    return game.terminal(game.from_board(board))
 
 
 def utility(board):
     """
     Returns 1 if X has won the game, -1 if O has won, 0 otherwise.
     """
-    win = winner(board)
-    if win is None:
-        return 0
-    elif win == X:
-        return 1
+    return game.utility(game.from_board(board))
+
+
+def set_cache_size(size):
+    """
+    Bounds the transposition table to size entries (None for unbounded),
+    evicting the least recently used entries.
+    """
+    bitboard.set_cache_size(size)
+
+
+def clear_cache():
+    """
+    Empties the transposition table and resets its hit/miss statistics.
+    """
+    bitboard.clear_cache()
+
+
+def cache_info():
+    """
+    Returns the transposition table hits, misses and current size.
+    """
+    return bitboard.cache_info()
+
+
+def stop_search():
+    """
+    Makes a minimax call running in another thread on a large board
+    return the best move found so far.
+    """
+    search.stop()
+
+
+def clear_stop():
+    """
+    Undoes stop_search; call it before submitting a new minimax call to
+    another thread.
+    """
+    search.clear_stop()
+
+
+def book_entry(state):
+    """
+    Returns the (best move bit, value) stored for the (x, o) state of a
+    3x3 board, or None if the state is terminal or unreachable.
+    """
+    global solution_table
+    if solution_table is None:
+        solution_table = book.load()
+    x, o = state
+    return solution_table.get(x | o << bitboard.CELLS)
+
+
+def enable_profiling(enabled=True):
+    global profiling
+    profiling = enabled
+
+
+def reset_profile():
+    profile_records.clear()
+
+
+def _counters():
+    stats = bitboard.cache_stats
+    return (stats["nodes"], stats["cutoffs"], stats["hits"], stats["misses"], stats["pruned"])
+
+
+def _record(function, board, source, action, start, before):
+    """
+    Appends the work done by one call to profile_records: nodes visited,
+    cutoffs, transposition table hits and misses, symmetric moves pruned,
+    search depth, root and effective branching factor, and wall time.
+    """
+    elapsed = time.perf_counter() - start
+    empty = count_empty(board)
+    if source == "alphabeta":
+        nodes, cutoffs = search.nodes, search.cutoffs
+        hits, misses = search.hits, search.misses
+        pruned = 0
+        depth = search.depth
     else:
-        return -1
+        nodes, cutoffs, hits, misses, pruned = (
+            after - previous for after, previous in zip(_counters(), before))
+        depth = empty if source == "bitboard" else 0
+    profile_records.append({
+        "call": len(profile_records) + 1,
+        "function": function,
+        "board": f"{ROWS}x{COLS}, {WIN_LENGTH} in a row",
+        "source": source,
+        "action": list(action) if action is not None else None,
+        "empty": empty,
+        "nodes": nodes,
+        "cutoffs": cutoffs,
+        "cache_hits": hits,
+        "cache_misses": misses,
+        "symmetry_pruned": pruned,
+        "depth": depth,
+        "branching": empty,
+        "effective_branching": round(nodes ** (1 / depth), 3) if depth and nodes else None,
+        "seconds": elapsed,
+    })
+
+
+def format_record(record):
+    action = "-" if record["action"] is None else tuple(record["action"])
+    return (f"#{record['call']} {record['function']} {action} via {record['source']}: "
+            f"{record['nodes']} nodes, {record['cutoffs']} cutoffs, "
+            f"{record['cache_hits']} hits/{record['cache_misses']} misses, "
+            f"depth {record['depth']}, {record['seconds'] * 1000:.2f}ms")
+
+
+def profile_report():
+    """
+    Returns the recorded calls, one per line, followed by their totals.
+    """
+    lines = [format_record(record) for record in profile_records]
+    nodes = sum(record["nodes"] for record in profile_records)
+    seconds = sum(record["seconds"] for record in profile_records)
+    rate = nodes / seconds if seconds > 0 else 0.0
+    lines.append(f"{len(profile_records)} calls, {nodes} nodes, "
+                 f"{seconds * 1000:.2f}ms ({rate:.0f} nodes/sec)")
+    return "\n".join(lines)
+
+
+def export_profile(path):
+    """
+    Writes the recorded calls to path as JSON.
+    """
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"records": profile_records}, f, indent=2)
 
 
 def mostValue(state,index):
     """
-    The value of this node is not determined by its utility, 
+    The value of this node is not determined by its utility,
     but is recursively determined by the values of the lower level nodes of this node
+
+    The player to move (index) follows from the board; the value comes
+    from the memoized bitboard search. Only defined for the 3x3 game.
     """
-    vals = [9999, -9999]
-    funcs = [min, max]
-    targets = [-1, 1]
+    if not is_classic():
+        raise RuntimeError("exact values are only computed for 3x3 boards")
+    if not profiling:
+        return _most_value(state)[0]
+    before = _counters()
+    start = time.perf_counter()
+    value, source = _most_value(state)
+    _record("mostValue", state, source, None, start, before)
+    return value
 
-    val = vals[index]
-    if terminal(state):
-        return utility(state)
-    for action in actions(state):
-        val = funcs[index](val, mostValue(result(state,action), 1-index))
-        if val == targets[index]: # pruning
-            return val
-    return val
+def _most_value(state):
+    position = bitboard.from_board(state)
+    if use_book:
+        entry = book_entry(position)
+        if entry is not None:
+            return entry[1], "book"
+    return bitboard.value(position), "bitboard"
 
 def minimax(board):
-    if terminal(board):
-        return None
-    
-    most_value = None
-    most_action = None
-    index = 0 if player(board) == X else 1
-    funcs = [min, max]
-    targets = [1, -1]
-
-    for action in actions(board):
-        val = mostValue(result(board,action), index)
-        if most_value is None or funcs[index](most_value, val) == most_value:
-            most_value = val
-            most_action = action
-        if val == targets[index]: # pruning
-            return most_action
-    return most_action
-    
\ No newline at end of file
+    """
+    Returns the optimal action for the current player on the board.
+
+    On 3x3 boards with 3 in a row the move is looked up in the solution
+    table (or solved exactly without use_book); otherwise the best move
+    found by alpha-beta within TIME_LIMIT seconds.
+    """
+    if not profiling:
+        return _minimax(board)[0]
+    before = _counters()
+    start = time.perf_counter()
+    action, source = _minimax(board)
+    _record("minimax", board, source, action, start, before)
+    return action
+
+
+def _minimax(board):
+    """
+    Returns the optimal action and where it came from: "book",
+    "bitboard" or "alphabeta".
+    """
+    if is_classic():
+        state = bitboard.from_board(board)
+        if use_book:
+            entry = book_entry(state)
+            if entry is not None:
+                return bitboard.bit_to_action(entry[0]), "book"
+        move = bitboard.best_move(state)
+        if move is None:
+            return None, "bitboard"
+        return bitboard.bit_to_action(move), "bitboard"
+
+    move = search.best_move(game.from_board(board))
+    if move is None:
+        return None, "alphabeta"
+    return game.bit_to_action(move), "alphabeta"
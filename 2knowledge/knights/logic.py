@@ -1,7 +1,104 @@
 import itertools
-
-
-class Sentence():
+import multiprocessing
+import os
+import weakref
+
+import sat
+
+# model_check evaluates truth tables up to this many symbols and above
+# it searches for a counter-model with the SAT solver
+SAT_THRESHOLD = 20
+
+# Most models parallel_check evaluates in one truth table
+PARTITION_SYMBOLS = 20
+
+
+class Interned(type):
+    """
+    Metaclass hash-consing sentences: constructing a sentence equal to a
+    live one returns that object, so repeated subformulas share one node
+    along with its cached symbols.
+
+    Conjunctions grow in place with And.add, so And(...) builds a new
+    object. Once a conjunction becomes an operand of another sentence it
+    is swapped for the shared conjunction with the same conjuncts, which
+    no longer accepts additions.
+
+    Sentences are keyed by class and operands. Apart from conjunctions
+    still being built, equal sentences are then one object, so they hash
+    by identity and a lookup usually hashes and compares its operands
+    without running any Python code. The table only holds weak
+    references, so unused sentences are still freed.
+    """
+
+    table = {}
+
+    def __call__(cls, *args):
+        key = None
+        if cls.interned:
+            key = (cls, *args)
+            try:
+                reference = Interned.table.get(key)
+            except TypeError:
+                # Unhashable symbol name: let the sentence fail to hash later
+                key = reference = None
+            if reference is not None:
+                sentence = reference()
+                if sentence is not None:
+                    return sentence
+
+        if And in map(type, args):
+            # The shared conjunctions equal the given ones, so the lookup
+            # above already missed for them too
+            args = tuple([Interned.share(arg) if type(arg) is And else arg for arg in args])
+            if key is not None:
+                key = (cls, *args)
+        sentence = super().__call__(*args)
+        sentence._symbols = None
+        if key is not None:
+            reference = Interned.table[key] = Reference(sentence, Interned.forget)
+            reference.key = key
+        return sentence
+
+    @staticmethod
+    def share(conjunction):
+        """
+        Returns the shared conjunction equal to conjunction, making
+        conjunction the shared one if there is none.
+        """
+        if conjunction._shared:
+            return conjunction
+        key = (And, *conjunction.conjuncts)
+        reference = Interned.table.get(key)
+        if reference is not None:
+            shared = reference()
+            if shared is not None:
+                return shared
+        conjunction._shared = True
+        reference = Interned.table[key] = Reference(conjunction, Interned.forget)
+        reference.key = key
+        return conjunction
+
+    @staticmethod
+    def forget(reference):
+        """Drops the table entry of a freed sentence."""
+        if Interned.table.get(reference.key) is reference:
+            del Interned.table[reference.key]
+
+
+class Reference(weakref.ref):
+    """Weak reference to a sentence that knows its key in Interned.table."""
+
+    __slots__ = ("key",)
+
+
+class Sentence(metaclass=Interned):
+
+    # _symbols is computed once per node, on first use
+    __slots__ = ("_symbols", "__weakref__")
+
+    # Whether constructing a sentence returns a shared node (see Interned)
+    interned = True
 
     def evaluate(self, model):
         """Evaluates the logical sentence."""
@@ -13,7 +110,25 @@ class Sentence():
 
     def symbols(self):
         """Returns a set of all symbols in the logical sentence."""
-        return set()
+        return set(self.symbol_set())
+
+    def symbol_set(self):
+        """Returns the symbols as a frozenset, computed once per node."""
+        return frozenset()
+
+    def encode(self, encoder):
+        """
+        Returns a solver literal equivalent to the sentence, adding the
+        clauses defining it to encoder's solver.
+        """
+        raise Exception("nothing to encode")
+
+    def truth_table(self, table):
+        """
+        Returns the sentence's column in table: an integer whose bit m is
+        the sentence's value in model m.
+        """
+        raise Exception("nothing to tabulate")
 
     @classmethod
     def validate(cls, sentence):
@@ -43,69 +158,101 @@ class Sentence():
 
 
 class Symbol(Sentence):
+    __slots__ = ("name",)
 
     def __init__(self, name):
         self.name = name
 
     def __eq__(self, other):
-        return isinstance(other, Symbol) and self.name == other.name
+        return self is other or (isinstance(other, Symbol) and self.name == other.name)
 
-    def __hash__(self):
-        return hash(("symbol", self.name))
+    # Equal sentences are one shared object (see Interned)
+    __hash__ = object.__hash__
 
     def __repr__(self):
         return self.name
 
+    def __reduce__(self):
+        # Unpickle through the constructor so the copy is shared too
+        return (Symbol, (self.name,))
+
     def evaluate(self, model):
         try:
             return bool(model[self.name])
         except KeyError:
             raise Exception(f"variable {self.name} not in model")
 
+    def encode(self, encoder):
+        return encoder.variable(self.name)
+
+    def truth_table(self, table):
+        return table.column(self.name)
+
     def formula(self):
         return self.name
 
-    def symbols(self):
-        return {self.name}
+    def symbol_set(self):
+        if self._symbols is None:
+            self._symbols = frozenset([self.name])
+        return self._symbols
 
 
 class Not(Sentence):
+    __slots__ = ("operand",)
+
     def __init__(self, operand):
         Sentence.validate(operand)
         self.operand = operand
 
     def __eq__(self, other):
-        return isinstance(other, Not) and self.operand == other.operand
+        return self is other or (isinstance(other, Not) and self.operand == other.operand)
 
-    def __hash__(self):
-        return hash(("not", hash(self.operand)))
+    # Equal sentences are one shared object (see Interned)
+    __hash__ = object.__hash__
 
     def __repr__(self):
         return f"Not({self.operand})"
 
+    def __reduce__(self):
+        return (Not, (self.operand,))
+
     def evaluate(self, model):
         return not self.operand.evaluate(model)
 
     def formula(self):
         return "¬" + Sentence.parenthesize(self.operand.formula())
 
-    def symbols(self):
-        return self.operand.symbols()
+    def symbol_set(self):
+        return self.operand.symbol_set()
+
+    def encode(self, encoder):
+        return -encoder.literal(self.operand)
+
+    def truth_table(self, table):
+        return table.full ^ table.value(self.operand)
 
 
 class And(Sentence):
+    # _shared: whether this is the shared conjunction of its conjuncts,
+    # as an operand of other sentences; _hash is computed on first use
+    __slots__ = ("conjuncts", "_shared", "_hash")
+
+    interned = False
+
     def __init__(self, *conjuncts):
         for conjunct in conjuncts:
             Sentence.validate(conjunct)
         self.conjuncts = list(conjuncts)
+        self._shared = False
+        self._hash = None
 
     def __eq__(self, other):
-        return isinstance(other, And) and self.conjuncts == other.conjuncts
+        return self is other or (isinstance(other, And) and self.conjuncts == other.conjuncts)
 
     def __hash__(self):
-        return hash(
-            ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
-        )
+        if self._hash is None:
+            self._hash = hash(("and", *self.conjuncts))
+        return self._hash
 
     def __repr__(self):
         conjunctions = ", ".join(
@@ -113,9 +260,23 @@ class And(Sentence):
         )
         return f"And({conjunctions})"
 
+    def __reduce__(self):
+        return (And, tuple(self.conjuncts))
+
     def add(self, conjunct):
+        """
+        Appends conjunct in place. Sentences are otherwise immutable, so
+        this is meant for conjunctions being built up, and raises
+        TypeError for the shared conjunction other sentences hold.
+        """
         Sentence.validate(conjunct)
+        if self._shared:
+            raise TypeError("cannot add to a conjunction inside another sentence")
+        if type(conjunct) is And:
+            conjunct = Interned.share(conjunct)
         self.conjuncts.append(conjunct)
+        self._hash = None
+        self._symbols = None
 
     def evaluate(self, model):
         return all(conjunct.evaluate(model) for conjunct in self.conjuncts)
@@ -126,28 +287,44 @@ class And(Sentence):
         return " ∧ ".join([Sentence.parenthesize(conjunct.formula())
                            for conjunct in self.conjuncts])
 
-    def symbols(self):
-        return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
+    def symbol_set(self):
+        if self._symbols is None:
+            self._symbols = frozenset().union(
+                *[conjunct.symbol_set() for conjunct in self.conjuncts])
+        return self._symbols
+
+    def encode(self, encoder):
+        literals = [encoder.literal(conjunct) for conjunct in self.conjuncts]
+        return -encoder.disjunction([-literal for literal in literals])
+
+    def truth_table(self, table):
+        result = table.full
+        for conjunct in self.conjuncts:
+            result &= table.value(conjunct)
+        return result
 
 
 class Or(Sentence):
+    __slots__ = ("disjuncts",)
+
     def __init__(self, *disjuncts):
         for disjunct in disjuncts:
             Sentence.validate(disjunct)
         self.disjuncts = list(disjuncts)
 
     def __eq__(self, other):
-        return isinstance(other, Or) and self.disjuncts == other.disjuncts
+        return self is other or (isinstance(other, Or) and self.disjuncts == other.disjuncts)
 
-    def __hash__(self):
-        return hash(
-            ("or", tuple(hash(disjunct) for disjunct in self.disjuncts))
-        )
+    # Equal sentences are one shared object (see Interned)
+    __hash__ = object.__hash__
 
     def __repr__(self):
         disjuncts = ", ".join([str(disjunct) for disjunct in self.disjuncts])
         return f"Or({disjuncts})"
 
+    def __reduce__(self):
+        return (Or, tuple(self.disjuncts))
+
     def evaluate(self, model):
         return any(disjunct.evaluate(model) for disjunct in self.disjuncts)
 
@@ -157,11 +334,25 @@ class Or(Sentence):
         return " ∨  ".join([Sentence.parenthesize(disjunct.formula())
                             for disjunct in self.disjuncts])
 
-    def symbols(self):
-        return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
+    def symbol_set(self):
+        if self._symbols is None:
+            self._symbols = frozenset().union(
+                *[disjunct.symbol_set() for disjunct in self.disjuncts])
+        return self._symbols
+
+    def encode(self, encoder):
+        return encoder.disjunction([encoder.literal(disjunct) for disjunct in self.disjuncts])
+
+    def truth_table(self, table):
+        result = 0
+        for disjunct in self.disjuncts:
+            result |= table.value(disjunct)
+        return result
 
 
 class Implication(Sentence):
+    __slots__ = ("antecedent", "consequent")
+
     def __init__(self, antecedent, consequent):
         Sentence.validate(antecedent)
         Sentence.validate(consequent)
@@ -169,16 +360,19 @@ class Implication(Sentence):
         self.consequent = consequent
 
     def __eq__(self, other):
-        return (isinstance(other, Implication)
-                and self.antecedent == other.antecedent
-                and self.consequent == other.consequent)
+        return self is other or (isinstance(other, Implication)
+                                 and self.antecedent == other.antecedent
+                                 and self.consequent == other.consequent)
 
-    def __hash__(self):
-        return hash(("implies", hash(self.antecedent), hash(self.consequent)))
+    # Equal sentences are one shared object (see Interned)
+    __hash__ = object.__hash__
 
     def __repr__(self):
         return f"Implication({self.antecedent}, {self.consequent})"
 
+    def __reduce__(self):
+        return (Implication, (self.antecedent, self.consequent))
+
     def evaluate(self, model):
         return ((not self.antecedent.evaluate(model))
                 or self.consequent.evaluate(model))
@@ -188,11 +382,24 @@ class Implication(Sentence):
         consequent = Sentence.parenthesize(self.consequent.formula())
         return f"{antecedent} => {consequent}"
 
-    def symbols(self):
-        return set.union(self.antecedent.symbols(), self.consequent.symbols())
+    def symbol_set(self):
+        if self._symbols is None:
+            self._symbols = self.antecedent.symbol_set() | self.consequent.symbol_set()
+        return self._symbols
+
+    def encode(self, encoder):
+        antecedent = encoder.literal(self.antecedent)
+        consequent = encoder.literal(self.consequent)
+        return encoder.disjunction([-antecedent, consequent])
+
+    def truth_table(self, table):
+        antecedent = table.value(self.antecedent)
+        return (table.full ^ antecedent) | table.value(self.consequent)
 
 
 class Biconditional(Sentence):
+    __slots__ = ("left", "right")
+
     def __init__(self, left, right):
         Sentence.validate(left)
         Sentence.validate(right)
@@ -200,64 +407,303 @@ class Biconditional(Sentence):
         self.right = right
 
     def __eq__(self, other):
-        return (isinstance(other, Biconditional)
-                and self.left == other.left
-                and self.right == other.right)
+        return self is other or (isinstance(other, Biconditional)
+                                 and self.left == other.left
+                                 and self.right == other.right)
 
-    def __hash__(self):
-        return hash(("biconditional", hash(self.left), hash(self.right)))
+    # Equal sentences are one shared object (see Interned)
+    __hash__ = object.__hash__
 
     def __repr__(self):
         return f"Biconditional({self.left}, {self.right})"
 
+    def __reduce__(self):
+        return (Biconditional, (self.left, self.right))
+
     def evaluate(self, model):
-        return ((self.left.evaluate(model)
-                 and self.right.evaluate(model))
-                or (not self.left.evaluate(model)
-                    and not self.right.evaluate(model)))
+        left = self.left.evaluate(model)
+        right = self.right.evaluate(model)
+        return left == right
 
     def formula(self):
         left = Sentence.parenthesize(str(self.left))
         right = Sentence.parenthesize(str(self.right))
         return f"{left} <=> {right}"
 
-    def symbols(self):
-        return set.union(self.left.symbols(), self.right.symbols())
-
-
-def model_check(knowledge, query):
-    """Checks if knowledge base entails query."""
-
-    def check_all(knowledge, query, symbols, model):
-        """Checks if knowledge base entails query, given a particular model."""
-
-        # If model has an assignment for each symbol
-        if not symbols:
-
-            # If knowledge base is true in model, then query must also be true
-            if knowledge.evaluate(model):
-                return query.evaluate(model)
-            return True
+    def symbol_set(self):
+        if self._symbols is None:
+            self._symbols = self.left.symbol_set() | self.right.symbol_set()
+        return self._symbols
+
+    def encode(self, encoder):
+        left = encoder.literal(self.left)
+        right = encoder.literal(self.right)
+        result = encoder.solver.new_variable()
+        encoder.solver.add_clause([-result, -left, right])
+        encoder.solver.add_clause([-result, left, -right])
+        encoder.solver.add_clause([result, left, right])
+        encoder.solver.add_clause([result, -left, -right])
+        return result
+
+    def truth_table(self, table):
+        return table.full ^ table.value(self.left) ^ table.value(self.right)
+
+
+class TruthTable():
+    """
+    Values of sentences in all 2^n models of symbols at once. Model m gives
+    symbols[i] the value of bit i of m, and a sentence's column is an
+    integer whose bit m is its value in model m, so each connective is
+    one bitwise operation over every model. Symbols in fixed (a dict from
+    name to truth value) hold that value in every model.
+    """
+
+    def __init__(self, symbols, fixed=None):
+        self.symbols = tuple(symbols)
+        self.fixed = fixed if fixed is not None else {}
+        self.size = 1 << len(self.symbols)
+        self.full = (1 << self.size) - 1
+        self.index = {symbol: i for i, symbol in enumerate(self.symbols)}
+        self.columns = {}
+
+    def column(self, name):
+        """
+        Returns the column of the symbol called name: runs of 2^i zeros
+        and 2^i ones for symbol i.
+        """
+        if name in self.fixed:
+            return self.full if self.fixed[name] else 0
+        try:
+            i = self.index[name]
+        except KeyError:
+            raise Exception(f"variable {name} not in model")
+        run = 1 << i
+        column = ((1 << run) - 1) << run
+        length = 2 * run
+        while length < self.size:
+            column |= column << length
+            length *= 2
+        return column
+
+    def value(self, sentence):
+        """Returns the column of sentence, computed once per table."""
+        column = self.columns.get(sentence)
+        if column is None:
+            column = self.columns[sentence] = sentence.truth_table(self)
+        return column
+
+    def count(self, sentence):
+        """Returns the number of models in which sentence is true."""
+        return self.value(sentence).bit_count()
+
+    def models(self, sentence):
+        """
+        Yields each model in which sentence is true as a dict from symbol
+        name to truth value.
+        """
+        column = self.value(sentence)
+        while column:
+            low = column & -column
+            m = low.bit_length() - 1
+            column ^= low
+            yield {symbol: bool(m >> i & 1) for i, symbol in enumerate(self.symbols)}
+
+
+class Encoder():
+    """
+    Tseitin encoding of sentences into a sat.Solver: one variable per
+    symbol and one per distinct compound subformula, defined by clauses
+    so that the variable is true exactly when the subformula is.
+    """
+
+    def __init__(self, solver=None):
+        self.solver = solver if solver is not None else sat.Solver()
+        self.variables = {}
+        self.literals = {}
+
+    def variable(self, name):
+        """Returns the solver variable of the symbol called name."""
+        variable = self.variables.get(name)
+        if variable is None:
+            variable = self.variables[name] = self.solver.new_variable()
+        return variable
+
+    def literal(self, sentence):
+        """Returns the solver literal equivalent to sentence."""
+        literal = self.literals.get(sentence)
+        if literal is None:
+            literal = self.literals[sentence] = sentence.encode(self)
+        return literal
+
+    def disjunction(self, literals):
+        """Returns a new variable defined as the disjunction of literals."""
+        result = self.solver.new_variable()
+        self.solver.add_clause([-result] + literals)
+        for literal in literals:
+            self.solver.add_clause([result, -literal])
+        return result
+
+    def require(self, sentence):
+        """
+        Adds clauses making sentence true. Conjunctions and disjunctions at
+        the top are added as clauses directly instead of through a
+        definition variable.
+        """
+        if isinstance(sentence, And):
+            for conjunct in sentence.conjuncts:
+                self.require(conjunct)
+        elif isinstance(sentence, Or):
+            self.solver.add_clause([self.literal(disjunct) for disjunct in sentence.disjuncts])
+        elif isinstance(sentence, Implication):
+            self.solver.add_clause([-self.literal(sentence.antecedent),
+                                    self.literal(sentence.consequent)])
         else:
+            self.solver.add_clause([self.literal(sentence)])
+
+
+def sat_check(knowledge, query):
+    """
+    Checks if knowledge base entails query by showing with the SAT solver
+    that knowledge and not query cannot both be true.
+    """
+    encoder = Encoder()
+    encoder.require(knowledge)
+    return not encoder.solver.solve([-encoder.literal(query)])
+
+
+class KnowledgeBase():
+    """
+    Knowledge base encoded once into a SAT solver that answers many
+    entailment queries and accepts new facts as they come. Encodings of
+    shared subformulas and clauses learned answering one query are kept
+    for the next.
+    """
+
+    def __init__(self, *sentences):
+        self.encoder = Encoder()
+        self.sentences = []
+        for sentence in sentences:
+            self.add(sentence)
+
+    def add(self, sentence):
+        """Adds sentence as a fact."""
+        Sentence.validate(sentence)
+        self.sentences.append(sentence)
+        self.encoder.require(sentence)
+
+    def consistent(self):
+        """Returns True if some model makes every fact true."""
+        return self.encoder.solver.solve()
+
+    def entails(self, query):
+        """Checks if the knowledge base entails query."""
+        return not self.encoder.solver.solve([-self.encoder.literal(query)])
+
+    def entailed(self, symbols):
+        """
+        Returns a dict mapping each of symbols to True if the knowledge
+        base entails it, False if it entails its negation, and None
+        otherwise.
+
+        One model of the knowledge base gives each symbol its only possible
+        entailed value; each model found while ruling a symbol out rules
+        out every other symbol it disagrees with too.
+        """
+        solver = self.encoder.solver
+        literals = {symbol: self.encoder.literal(symbol) for symbol in symbols}
+        if not solver.solve():
+            # Everything follows from an inconsistent knowledge base
+            return {symbol: True for symbol in symbols}
+
+        def holds(literal, model):
+            return model[abs(literal)] == (literal > 0)
+
+        model = solver.model
+        candidates = {symbol: literal if holds(literal, model) else -literal
+                      for symbol, literal in literals.items()}
+        result = {symbol: None for symbol in symbols}
+        while candidates:
+            symbol, literal = candidates.popitem()
+            if not solver.solve([-literal]):
+                result[symbol] = literal == literals[symbol]
+                continue
+            model = solver.model
+            for other, other_literal in list(candidates.items()):
+                if not holds(other_literal, model):
+                    del candidates[other]
+        return result
+
+
+# Sentences, symbols and stop flag of each parallel_check worker process
+worker_task = None
+
+
+def init_worker(knowledge, query, symbols, split, found):
+    global worker_task
+    worker_task = (knowledge, query, symbols, split, found)
+
+
+def check_partition(prefix):
+    """
+    Checks the models in which the first split symbols take the values of
+    the bits of prefix. Returns False if one has knowledge true and query
+    false, and True otherwise or once another worker has found one.
+    """
+    knowledge, query, symbols, split, found = worker_task
+    if found.is_set():
+        return True
+    fixed = {symbol: bool(prefix >> i & 1) for i, symbol in enumerate(symbols[:split])}
+    table = TruthTable(symbols[split:], fixed)
+    if table.value(knowledge) & (table.full ^ table.value(query)):
+        found.set()
+        return False
+    return True
+
+
+def parallel_check(knowledge, query, processes=None, split=None):
+    """
+    Checks if knowledge base entails query by splitting the models on the
+    values of the first split symbols into 2^split partitions, evaluated
+    as truth tables across a process pool. Stops every worker as soon as
+    one finds a counter-model.
+    """
+    symbols = tuple(sorted(knowledge.symbol_set() | query.symbol_set()))
+    workers = processes or os.cpu_count() or 1
+    if split is None:
+        # Several partitions per worker to balance the load, each small
+        # enough to tabulate
+        split = max((4 * workers - 1).bit_length(), len(symbols) - PARTITION_SYMBOLS)
+    split = min(split, len(symbols))
+
+    found = multiprocessing.Event()
+    initargs = (knowledge, query, symbols, split, found)
+    partitions = 1 << split
+    chunksize = max(1, partitions // (16 * workers))
+    with multiprocessing.Pool(workers, initializer=init_worker, initargs=initargs) as pool:
+        # Partitions left after a counter-model return at once, so drain
+        # them: terminating the pool while its task handler is still
+        # queueing tasks can deadlock
+        results = list(pool.imap_unordered(check_partition, range(partitions), chunksize))
+    return all(results)
+
+
+def model_check(knowledge, query, processes=None):
+    """
+    Checks if knowledge base entails query. With processes, enumerates
+    the models in parallel (see parallel_check) whatever their number.
+    """
 
-            # Choose one of the remaining unused symbols
-            remaining = symbols.copy()
-            p = remaining.pop()
-
-            # Create a model where the symbol is true
-            model_true = model.copy()
-            model_true[p] = True
-
-            # Create a model where the symbol is false
-            model_false = model.copy()
-            model_false[p] = False
+    # Get all symbols in both knowledge and query
+    symbols = tuple(sorted(knowledge.symbol_set() | query.symbol_set()))
 
-            # Ensure entailment holds in both models
-            return (check_all(knowledge, query, remaining, model_true) and
-                    check_all(knowledge, query, remaining, model_false))
+    if processes is not None:
+        return parallel_check(knowledge, query, processes)
 
-    # Get all symbols in both knowledge and query
-    symbols = set.union(knowledge.symbols(), query.symbols())
+    # Too many models to enumerate: search for a counter-model instead
+    if len(symbols) > SAT_THRESHOLD:
+        return sat_check(knowledge, query)
 
-    # Check that knowledge entails query
-    return check_all(knowledge, query, symbols, dict())
+    # Knowledge entails query if query is true in every model where
+    # knowledge is true: no model has knowledge true and query false
+    table = TruthTable(symbols)
+    return not table.value(knowledge) & (table.full ^ table.value(query))
@@ -72,8 +72,9 @@ def main():
         if len(knowledge.conjuncts) == 0:
             print("    Not yet implemented.")
         else:
+            entailed = KnowledgeBase(knowledge).entailed(symbols)
             for symbol in symbols:
-                if model_check(knowledge, symbol):
+                if entailed[symbol]:
                     print(f"    {symbol}")
 
 
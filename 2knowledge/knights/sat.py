@@ -0,0 +1,296 @@
+"""
+Conflict-driven clause learning (CDCL) SAT solver
+
+Variables are the integers 1, 2, ...; literal v means variable v is
+true and -v that it is false. Clauses are lists of literals. The solver
+is incremental: clauses can be added between calls to solve, which may
+assume extra literals, and clauses learned in one call are kept for the
+next.
+"""
+
+import heapq
+
+# Activity decay per conflict for choosing decision variables
+DECAY = 0.95
+# Conflicts before the first restart; later restarts follow the Luby sequence
+RESTART_BASE = 100
+
+
+def luby(i):
+    """
+    Returns the i-th element (from 1) of the Luby sequence 1, 1, 2, 1, 1, 2, 4, ...
+    """
+    size, power = 1, 0
+    while size < i + 1:
+        power += 1
+        size = 2 * size + 1
+    while size - 1 != i:
+        size = (size - 1) >> 1
+        power -= 1
+        i %= size
+    return 1 << power
+
+
+class Solver():
+    def __init__(self):
+        self.ok = True
+        self.variables = 0
+        # Per variable (index 0 unused): 1 true, -1 false, 0 unassigned
+        self.value = [0]
+        self.level = [0]
+        self.reason = [None]
+        self.activity = [0.0]
+        self.phase = [False]
+        self.watches = {}
+        self.order = []
+        self.trail = []
+        self.limits = []
+        self.head = 0
+        self.bump = 1.0
+        self.clauses = []
+        self.learned = []
+        self.model = None
+        self.stats = {"decisions": 0, "propagations": 0, "conflicts": 0, "restarts": 0}
+
+    def new_variable(self):
+        self.variables += 1
+        variable = self.variables
+        self.value.append(0)
+        self.level.append(0)
+        self.reason.append(None)
+        self.activity.append(0.0)
+        self.phase.append(False)
+        self.watches[variable] = []
+        self.watches[-variable] = []
+        heapq.heappush(self.order, (0.0, variable))
+        return variable
+
+    def literal_value(self, literal):
+        value = self.value[abs(literal)]
+        return value if literal > 0 else -value
+
+    def add_clause(self, literals):
+        """
+        Adds the clause of literals. Returns False if the clauses are now
+        known to be unsatisfiable.
+        """
+        if not self.ok:
+            return False
+        self.cancel_until(0)
+        clause = []
+        for literal in dict.fromkeys(literals):
+            while abs(literal) > self.variables:
+                self.new_variable()
+            if -literal in clause:
+                return True
+            value = self.literal_value(literal)
+            if value == 1:
+                return True
+            if value == 0:
+                clause.append(literal)
+
+        if not clause:
+            self.ok = False
+        elif len(clause) == 1:
+            self.assign(clause[0], None)
+            if self.propagate() is not None:
+                self.ok = False
+        else:
+            self.attach(clause)
+            self.clauses.append(clause)
+        return self.ok
+
+    def attach(self, clause):
+        self.watches[clause[0]].append(clause)
+        self.watches[clause[1]].append(clause)
+
+    def assign(self, literal, reason):
+        variable = abs(literal)
+        self.value[variable] = 1 if literal > 0 else -1
+        self.level[variable] = len(self.limits)
+        self.reason[variable] = reason
+        self.trail.append(literal)
+
+    def propagate(self):
+        """
+        Assigns the literals implied by unit clauses, watching two
+        unassigned-or-true literals per clause. Returns a clause made
+        false, or None.
+        """
+        value = self.value
+        watches = self.watches
+        while self.head < len(self.trail):
+            false = -self.trail[self.head]
+            self.head += 1
+            self.stats["propagations"] += 1
+            watching = watches[false]
+            kept = []
+            for position, clause in enumerate(watching):
+                if clause[0] == false:
+                    clause[0], clause[1] = clause[1], false
+                first = clause[0]
+                first_value = value[first] if first > 0 else -value[-first]
+                if first_value == 1:
+                    kept.append(clause)
+                    continue
+                for k in range(2, len(clause)):
+                    other = clause[k]
+                    if (value[other] if other > 0 else -value[-other]) != -1:
+                        clause[1], clause[k] = other, false
+                        watches[other].append(clause)
+                        break
+                else:
+                    kept.append(clause)
+                    if first_value == -1:
+                        kept.extend(watching[position + 1:])
+                        watches[false] = kept
+                        return clause
+                    self.assign(first, clause)
+            watches[false] = kept
+        return None
+
+    def analyze(self, conflict):
+        """
+        Returns the first-UIP clause learned from conflict, its asserting
+        literal first and a literal of the backjump level second, and the
+        level to backjump to.
+        """
+        level = len(self.limits)
+        seen = set()
+        learned = [None]
+        pending = 0
+        literal = None
+        index = len(self.trail) - 1
+        clause = conflict
+        while True:
+            for other in clause:
+                if other == literal:
+                    continue
+                variable = abs(other)
+                if variable not in seen and self.level[variable] > 0:
+                    seen.add(variable)
+                    self.bump_variable(variable)
+                    if self.level[variable] == level:
+                        pending += 1
+                    else:
+                        learned.append(other)
+            while abs(self.trail[index]) not in seen:
+                index -= 1
+            literal = self.trail[index]
+            index -= 1
+            seen.discard(abs(literal))
+            pending -= 1
+            if pending == 0:
+                break
+            clause = self.reason[abs(literal)]
+        learned[0] = -literal
+
+        back_level = 0
+        if len(learned) > 1:
+            deepest = max(range(1, len(learned)), key=lambda i: self.level[abs(learned[i])])
+            learned[1], learned[deepest] = learned[deepest], learned[1]
+            back_level = self.level[abs(learned[1])]
+        return learned, back_level
+
+    def bump_variable(self, variable):
+        self.activity[variable] += self.bump
+        if self.activity[variable] > 1e100:
+            for other in range(1, self.variables + 1):
+                self.activity[other] *= 1e-100
+            self.bump *= 1e-100
+            self.order = [(-self.activity[other], other)
+                          for other in range(1, self.variables + 1)]
+            heapq.heapify(self.order)
+        elif not self.value[variable]:
+            heapq.heappush(self.order, (-self.activity[variable], variable))
+
+    def cancel_until(self, level):
+        if len(self.limits) <= level:
+            return
+        start = self.limits[level]
+        for literal in self.trail[start:]:
+            variable = abs(literal)
+            self.phase[variable] = literal > 0
+            self.value[variable] = 0
+            self.reason[variable] = None
+            heapq.heappush(self.order, (-self.activity[variable], variable))
+        del self.trail[start:]
+        del self.limits[level:]
+        self.head = len(self.trail)
+
+    def pick_branch(self):
+        """
+        Returns the unassigned variable with the highest activity, or None.
+        """
+        while self.order:
+            _, variable = heapq.heappop(self.order)
+            if not self.value[variable]:
+                return variable
+        for variable in range(1, self.variables + 1):
+            if not self.value[variable]:
+                return variable
+        return None
+
+    def solve(self, assumptions=()):
+        """
+        Returns True if the clauses and the assumed literals can all be
+        true, setting model to a list of each variable's value (index 0
+        unused), and False otherwise.
+        """
+        self.model = None
+        if not self.ok:
+            return False
+        self.cancel_until(0)
+        for literal in assumptions:
+            while abs(literal) > self.variables:
+                self.new_variable()
+
+        restarts = 0
+        budget = RESTART_BASE * luby(restarts)
+        conflicts = 0
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                self.stats["conflicts"] += 1
+                if not self.limits:
+                    self.ok = False
+                    return False
+                learned, back_level = self.analyze(conflict)
+                self.cancel_until(back_level)
+                if len(learned) == 1:
+                    self.assign(learned[0], None)
+                else:
+                    self.attach(learned)
+                    self.learned.append(learned)
+                    self.assign(learned[0], learned)
+                self.bump /= DECAY
+                conflicts += 1
+                if conflicts >= budget:
+                    self.stats["restarts"] += 1
+                    self.cancel_until(0)
+                    restarts += 1
+                    budget = RESTART_BASE * luby(restarts)
+                    conflicts = 0
+                continue
+
+            level = len(self.limits)
+            if level < len(assumptions):
+                # Assumptions are the first decisions, one level each
+                literal = assumptions[level]
+                value = self.literal_value(literal)
+                if value == -1:
+                    self.cancel_until(0)
+                    return False
+                self.limits.append(len(self.trail))
+                if value == 0:
+                    self.assign(literal, None)
+                continue
+
+            variable = self.pick_branch()
+            if variable is None:
+                self.model = [value == 1 for value in self.value]
+                self.cancel_until(0)
+                return True
+            self.stats["decisions"] += 1
+            self.limits.append(len(self.trail))
+            self.assign(variable if self.phase[variable] else -variable, None)